@@ -1,48 +1,225 @@
 """Analyze stock using yfinance - auto-resolves company names to tickers"""
 from http.server import BaseHTTPRequestHandler
 import json
+import gzip
+import hashlib
+import re
+import math
+import functools
+import threading
+import time
 import urllib.parse
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout, wait
+from dataclasses import dataclass
 from datetime import datetime
 import yfinance as yf
 
+try:
+    import orjson
+    
+    def _dumps(obj):
+        # yfinance can return numpy scalars inside info
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+# (divisor, format) per thousands tier: units, K, M, B, T
+_NUMBER_TIERS = ((1.0, '%.0f'), (1e3, '%.0fK'), (1e6, '%.0fM'), (1e9, '%.1fB'), (1e12, '%.1fT'))
+
+@functools.lru_cache(maxsize=1024)
 def format_number(n):
     if n is None or n == 0:
         return '0'
     n = float(n)
-    if abs(n) >= 1e12:
-        return f'{n/1e12:.1f}T'
-    if abs(n) >= 1e9:
-        return f'{n/1e9:.1f}B'
-    if abs(n) >= 1e6:
-        return f'{n/1e6:.0f}M'
-    if abs(n) >= 1e3:
-        return f'{n/1e3:.0f}K'
-    return f'{n:.0f}'
+    a = abs(n)
+    if a >= 1e12:
+        tier = 4
+    elif a >= 1e3:
+        tier = int(math.log10(a)) // 3
+        # log10 can round up just below a power of ten
+        if a < _NUMBER_TIERS[tier][0]:
+            tier -= 1
+    else:
+        tier = 0
+    div, fmt = _NUMBER_TIERS[tier]
+    return fmt % (n / div)
+
+# Warm-instance caches: key -> (fetched_at, value), LRU-bounded.
+# Only successful lookups are stored, so misses are retried next time.
+INFO_CACHE_TTL = 300  # seconds - yfinance info dicts by symbol
+RESOLVE_CACHE_TTL = 3600  # seconds - name -> ticker resolutions
+CACHE_MAX = 1024
+_info_cache = OrderedDict()
+_resolve_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _cache_get(cache, key, ttl):
+    with _cache_lock:
+        cached = cache.get(key)
+        if cached and time.monotonic() - cached[0] < ttl:
+            cache.move_to_end(key)
+            return cached[1]
+    return None
+
+def _cache_put(cache, key, value):
+    with _cache_lock:
+        cache[key] = (time.monotonic(), value)
+        cache.move_to_end(key)
+        if len(cache) > CACHE_MAX:
+            cache.popitem(last=False)
+
+# The only info keys the analysis reads - everything else is dropped before caching
+INFO_KEYS = frozenset((
+    'quoteType', 'longName', 'shortName', 'sector', 'industry', 'category',
+    'currentPrice', 'regularMarketPrice', 'navPrice', 'regularMarketChangePercent',
+    'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'marketCap', 'sharesOutstanding',
+    'returnOnAssets', 'returnOnEquity', 'profitMargins', 'grossMargins',
+    'totalCash', 'totalDebt', 'totalRevenue', 'freeCashflow', 'netIncomeToCommon', 'bookValue',
+    'trailingEps', 'forwardEps', 'trailingPE', 'forwardPE', 'pegRatio',
+    'priceToBook', 'priceToSalesTrailing12Months', 'targetMeanPrice',
+    'earningsGrowth', 'earningsQuarterlyGrowth', 'revenueGrowth',
+    'annualReportExpenseRatio', 'totalAssets', 'ytdReturn', 'threeYearAverageReturn',
+    'fiveYearAverageReturn', 'yield', 'dividendYield', 'beta', 'beta3Year',
+))
+
+# Well-known company names -> ticker, so common searches skip yf.Search.
+# Only unambiguous names; short/noisy ones (gap, target...) go to search.
+COMPANY_TICKERS = {
+    'apple': 'AAPL', 'microsoft': 'MSFT', 'alphabet': 'GOOGL', 'google': 'GOOGL',
+    'amazon': 'AMZN', 'nvidia': 'NVDA', 'meta platforms': 'META', 'facebook': 'META',
+    'tesla': 'TSLA', 'berkshire hathaway': 'BRK-B', 'netflix': 'NFLX', 'broadcom': 'AVGO',
+    'jpmorgan': 'JPM', 'jpmorgan chase': 'JPM', 'visa': 'V', 'mastercard': 'MA',
+    'walmart': 'WMT', 'costco': 'COST', 'johnson & johnson': 'JNJ', 'procter & gamble': 'PG',
+    'coca-cola': 'KO', 'coca cola': 'KO', 'pepsico': 'PEP', 'mcdonalds': 'MCD', "mcdonald's": 'MCD',
+    'disney': 'DIS', 'walt disney': 'DIS', 'nike': 'NKE', 'starbucks': 'SBUX',
+    'exxon': 'XOM', 'exxon mobil': 'XOM', 'chevron': 'CVX', 'pfizer': 'PFE',
+    'eli lilly': 'LLY', 'unitedhealth': 'UNH', 'home depot': 'HD', 'oracle': 'ORCL',
+    'salesforce': 'CRM', 'adobe': 'ADBE', 'intel': 'INTC', 'amd': 'AMD',
+    'advanced micro devices': 'AMD', 'qualcomm': 'QCOM', 'cisco': 'CSCO', 'ibm': 'IBM',
+    'paypal': 'PYPL', 'uber': 'UBER', 'airbnb': 'ABNB', 'shopify': 'SHOP',
+    'palantir': 'PLTR', 'boeing': 'BA', 'bank of america': 'BAC', 'goldman sachs': 'GS',
+    'spotify': 'SPOT', 'etsy': 'ETSY', 'pinterest': 'PINS',
+}
+# Tickers of the companies above - resolve to themselves without a search
+KNOWN_TICKERS = frozenset(COMPANY_TICKERS.values())
+_COMPANY_SUFFIXES = (' inc.', ' inc', ' corporation', ' corp.', ' corp', ' co.', ' company', ' ltd')
+
+# Anything else can't be a Yahoo symbol (e.g. contains spaces) - skip the direct lookup
+_TICKER_RE = re.compile(r'^\^?[A-Z0-9][A-Z0-9.\-=]{0,14}$')
+
+def is_ticker_list(query):
+    """True when query is a bare comma list of tickers (AAPL,MSFT).
+    Spaces, company suffixes (INC, CORP...) or a known name mean it's one company name."""
+    if lookup_company(query):
+        return False
+    parts = [part for part in query.split(',') if part]
+    for part in parts:
+        if not _TICKER_RE.match(part.upper()) or ' ' + part.lower() in _COMPANY_SUFFIXES:
+            return False
+    return bool(parts)
+
+def lookup_company(query):
+    """Offline company-name -> ticker lookup. Returns ticker or None."""
+    name = query.lower().strip()
+    for suffix in _COMPANY_SUFFIXES:
+        if name.endswith(suffix):
+            name = name[:-len(suffix)].rstrip(' ,')
+            break
+    return COMPANY_TICKERS.get(name)
+
+# Response timestamp, re-rendered at most once per second
+_ts_second = None
+_ts_iso = None
+
+def now_iso():
+    """datetime.now().isoformat() at one-second resolution, cached per second"""
+    global _ts_second, _ts_iso
+    second = int(time.time())
+    if second != _ts_second:
+        _ts_iso = datetime.fromtimestamp(second).isoformat()
+        _ts_second = second
+    return _ts_iso
+
+# Shared across requests so warm instances don't rebuild threads
+_EXECUTOR = ThreadPoolExecutor(max_workers=4)
+# Longest wait for yf.Search name resolution - stays under Vercel's 10s limit
+RESOLVE_TIMEOUT = 5  # seconds
+# Deadline for a whole ?symbols= batch, same limit
+BATCH_TIMEOUT = 8  # seconds
+
+RESOLVABLE_TYPES = frozenset(('EQUITY', 'ETF'))
 
 def resolve_symbol(query):
     """Search Yahoo Finance via yfinance to resolve a company name to a ticker.
-    Returns (resolved_symbol, company_name) or (None, None) if not found."""
+    Returns (resolved_symbol, company_name) or (None, None) if not found.
+    Hits are cached for RESOLVE_CACHE_TTL seconds."""
+    key = query.lower().strip()
+    ticker = key.upper()
+    if ticker in KNOWN_TICKERS:
+        return ticker, ticker
+    cached = _cache_get(_resolve_cache, key, RESOLVE_CACHE_TTL)
+    if cached is not None:
+        return cached
+    
+    result = _search_symbol(query)
+    if result[0]:
+        _cache_put(_resolve_cache, key, result)
+    return result
+
+def _search_symbol(query):
+    """Uncached yf.Search lookup"""
     try:
         search = yf.Search(query, max_results=5, news_count=0)
         quotes = search.quotes if hasattr(search, 'quotes') else []
         for q in quotes:
-            qt = q.get('quoteType', '')
-            if qt in ('EQUITY', 'ETF'):
-                sym = q.get('symbol', '')
-                name = q.get('shortname') or q.get('longname') or sym
-                if sym:
-                    return sym, name
+            sym = q.get('symbol')
+            if sym and q.get('quoteType') in RESOLVABLE_TYPES:
+                return sym, q.get('shortname') or q.get('longname') or sym
     except Exception as e:
         print(f"resolve_symbol error: {e}")
     return None, None
 
 def try_yfinance(symbol):
-    """Try to get stock info via yfinance. Returns info dict or None."""
+    """Try to get stock info via yfinance. Returns info dict or None.
+    Successful lookups are served from _info_cache for INFO_CACHE_TTL seconds."""
+    info = cached_info(symbol)
+    if info is not None:
+        return info
+    
+    info = _fetch_info(symbol)
+    if info is not None:
+        _cache_put(_info_cache, symbol, info)
+    return info
+
+def try_yfinance_many(symbols, timeout=BATCH_TIMEOUT):
+    """try_yfinance for several symbols: {symbol: info dict or None}.
+    Cached symbols are answered directly; only the misses are fetched, concurrently.
+    Fetches still running after timeout seconds are left out of the dict - they
+    finish in the background and land in the cache for the next request."""
+    infos = {symbol: cached_info(symbol) for symbol in symbols}
+    misses = [symbol for symbol, info in infos.items() if info is None]
+    if misses:
+        futures = {_EXECUTOR.submit(try_yfinance, symbol): symbol for symbol in misses}
+        done, pending = wait(futures, timeout=timeout)
+        for future in done:
+            infos[futures[future]] = future.result()
+        for future in pending:
+            del infos[futures[future]]
+    return infos
+
+def cached_info(symbol):
+    """Return a fresh cached info dict for symbol, or None (no network)"""
+    return _cache_get(_info_cache, symbol, INFO_CACHE_TTL)
+
+def _fetch_info(symbol):
+    """Uncached yfinance info lookup"""
     try:
         stock = yf.Ticker(symbol)
         info = stock.info
         if info and (info.get('regularMarketPrice') or info.get('currentPrice')):
-            return info
+            return {k: v for k, v in info.items() if k in INFO_KEYS}
     except Exception:
         pass
     return None
@@ -60,8 +237,10 @@ def to_pct(val):
     Values > 10 are likely already percentages from a different source."""
     if val is None:
         return 0
-    val = float(val)
-    if abs(val) > 10:
+    # yfinance ratios are nearly always floats already - skip the conversion
+    if val.__class__ is not float:
+        val = float(val)
+    if val > 10 or val < -10:
         # Already looks like a percentage (e.g. 24.4 not 0.244)
         return val
     return val * 100
@@ -87,6 +266,9 @@ def calculate_roic(info):
     return (net_income / invested_capital) * 100
 
 
+# Rule #1 minimum acceptable return: 15%/yr over 10 years
+DISCOUNT_10Y = 1.15 ** 10
+
 def calculate_sticker_price(info, price):
     """Phil Town's Rule #1 Sticker Price with 50% Margin of Safety.
     Sticker = EPS × (1+g)^10 × min(2×g%, 50) ÷ 1.15^10
@@ -124,7 +306,7 @@ def calculate_sticker_price(info, price):
     future_eps = eps * (1 + growth_rate) ** 10
     future_pe = min(2 * growth_rate * 100, 50)
     future_price = future_eps * future_pe
-    sticker_price = future_price / (1.15 ** 10)
+    sticker_price = future_price / DISCOUNT_10Y
     mos_price = sticker_price / 2
     if price <= mos_price:
         verdict, verdict_color = 'ON SALE', '#00d374'
@@ -147,53 +329,45 @@ def calculate_sticker_price(info, price):
     }
 
 
-def calculate_rule1(info, price):
-    """Full Rule #1 analysis: Big 5 Numbers + Sticker Price + Moat."""
-    big5 = []
+# Big 5 in display order: (name, note). Every metric targets >= 10%.
+BIG5_SPECS = (
+    ('ROIC', None),
+    ('Revenue Growth', None),
+    ('EPS Growth', None),
+    ('Equity Growth', 'quarterly earnings proxy'),
+    ('FCF Margin', 'FCF as % of revenue'),
+)
+
+def _build_metric(name, value, note=None):
+    """One Big 5 entry from a percent value (None when unavailable)."""
+    metric = {
+        'name': name, 'value': round(value, 1) if value is not None else None,
+        'unit': '%', 'pass': value is not None and value >= 10, 'target': '≥ 10%',
+    }
+    if note:
+        metric['note'] = note
+    return metric
+
+def calculate_rule1(info, price, rg_pct, eg_pct, eq_pct, roe_pct):
+    """Full Rule #1 analysis: Big 5 Numbers + Sticker Price + Moat.
+    Growth rates and ROE come in as percentages (None when missing) -
+    build_stock_result has already converted them."""
     # 1. ROIC
     roic = calculate_roic(info)
-    big5.append({
-        'name': 'ROIC', 'value': round(roic, 1) if roic is not None else None,
-        'unit': '%', 'pass': roic is not None and roic >= 10, 'target': '≥ 10%',
-    })
-    # 2. Revenue Growth
-    rg = info.get('revenueGrowth')
-    rg_pct = to_pct(rg) if rg is not None else None
-    big5.append({
-        'name': 'Revenue Growth', 'value': round(rg_pct, 1) if rg_pct is not None else None,
-        'unit': '%', 'pass': rg_pct is not None and rg_pct >= 10, 'target': '≥ 10%',
-    })
-    # 3. EPS Growth
-    eg = info.get('earningsGrowth')
-    eg_pct = to_pct(eg) if eg is not None else None
-    big5.append({
-        'name': 'EPS Growth', 'value': round(eg_pct, 1) if eg_pct is not None else None,
-        'unit': '%', 'pass': eg_pct is not None and eg_pct >= 10, 'target': '≥ 10%',
-    })
-    # 4. Equity Growth (quarterly earnings growth as proxy)
-    eq_g = info.get('earningsQuarterlyGrowth')
-    eq_pct = to_pct(eq_g) if eq_g is not None else None
-    big5.append({
-        'name': 'Equity Growth', 'value': round(eq_pct, 1) if eq_pct is not None else None,
-        'unit': '%', 'pass': eq_pct is not None and eq_pct >= 10, 'target': '≥ 10%',
-        'note': 'quarterly earnings proxy',
-    })
+    # 2. Revenue Growth (rg_pct), 3. EPS Growth (eg_pct),
+    # 4. Equity Growth (eq_pct - quarterly earnings growth as proxy)
     # 5. FCF Margin (proxy for FCF health)
     fcf = safe_get(info, 'freeCashflow', 0)
     revenue = safe_get(info, 'totalRevenue', 0)
     fcf_margin = (fcf / revenue * 100) if revenue and fcf else None
-    big5.append({
-        'name': 'FCF Margin', 'value': round(fcf_margin, 1) if fcf_margin is not None else None,
-        'unit': '%', 'pass': fcf_margin is not None and fcf_margin >= 10, 'target': '≥ 10%',
-        'note': 'FCF as % of revenue',
-    })
+    
+    values = (roic, rg_pct, eg_pct, eq_pct, fcf_margin)
+    big5 = [_build_metric(name, value, note) for (name, note), value in zip(BIG5_SPECS, values)]
     passing = sum(1 for m in big5 if m['pass'])
     # Sticker Price
     sticker = calculate_sticker_price(info, price)
     # Moat assessment
-    roe = info.get('returnOnEquity')
-    roe_pct = to_pct(roe) if roe is not None else 0
-    has_moat = roic is not None and roic >= 10 and roe_pct >= 15
+    has_moat = roic is not None and roic >= 10 and roe_pct is not None and roe_pct >= 15
     return {
         'big5': big5,
         'big5_passing': passing,
@@ -204,63 +378,122 @@ def calculate_rule1(info, price):
     }
 
 
-def calculate_score(data):
-    """Calculate investment score with proportional scaling.
+@dataclass(slots=True)
+class Metrics:
+    """Scoring inputs for one stock. roa/roe/profit_margin are already percentages
+    (via to_pct) and stay None when Yahoo has no value."""
+    price: float
+    roa: float | None
+    roe: float | None
+    cash: float
+    debt: float
+    profit_margin: float | None
+    ps_ratio: float
+    fcf: float
+    eps: float
+    market_cap: float
+    fair_value: float = 0.0
+
+# Checklist wording per (check, tier) as (pass, text); tiers come from _score_kernel
+CHECK_LABELS = {
+    'roa': (
+        (True, lambda v: f'ROA ({v:.1f}%) excellent'),
+        ('warn', lambda v: f'ROA ({v:.1f}%) decent'),
+        (False, lambda v: f'ROA ({v:.1f}%) weak'),
+    ),
+    'roe': (
+        (True, lambda v: f'ROE ({v:.1f}%) excellent'),
+        ('warn', lambda v: f'ROE ({v:.1f}%) decent'),
+        (False, lambda v: f'ROE ({v:.1f}%) weak'),
+    ),
+    'debt': (
+        (True, lambda v: f'Cash covers {v:.1f}x debt'),
+        ('warn', lambda v: f'Cash covers {v:.1f}x debt'),
+        (False, lambda v: f'Cash only {v:.1f}x debt'),
+        (True, lambda v: f'Cash (${format_number(v)}) & minimal debt'),
+        ('warn', lambda v: 'Cash/Debt data limited'),
+    ),
+    'value': (
+        (True, lambda v: f'{v:.0f}% undervalued'),
+        ('warn', lambda v: f'{v:.0f}% below fair value'),
+        ('warn', lambda v: f'{v:.0f}% near fair value'),
+        (False, lambda v: f'Overvalued by {abs(v):.0f}%'),
+    ),
+    'margin': (
+        (True, lambda v: f'Strong margin ({v:.1f}%)'),
+        ('warn', lambda v: f'Margin ({v:.1f}%)'),
+        ('warn', lambda v: f'Thin margin ({v:.1f}%)'),
+        (False, lambda v: f'Negative margin ({v:.1f}%)'),
+    ),
+    'ps': (
+        (True, lambda v: f'P/S ({v:.2f}x) very attractive'),
+        (True, lambda v: f'P/S ({v:.2f}x) attractive'),
+        ('warn', lambda v: f'P/S ({v:.2f}x) moderate'),
+        (False, lambda v: f'P/S ({v:.2f}x) expensive'),
+    ),
+    'fcf': (
+        (True, lambda v: f'Strong FCF yield ({v:.1f}%)'),
+        (True, lambda v: f'Positive FCF yield ({v:.1f}%)'),
+        ('warn', lambda v: f'Low FCF yield ({v:.1f}%)'),
+        (True, lambda v: f'Positive FCF (${format_number(v)})'),
+        (False, lambda v: 'Negative/no FCF'),
+    ),
+}
+CHECK_MAX = {'roa': 15, 'roe': 15, 'debt': 15, 'value': 20, 'margin': 10, 'ps': 10, 'fcf': 15}
+
+def calculate_score(m):
+    """Calculate investment score for a Metrics record with proportional scaling.
     Instead of all-or-nothing, metrics earn points based on how well they perform."""
-    score = 0
-    checks = []
+    price = m.price or 0
+    score, results = _score_kernel(
+        m.roa or 0,
+        m.roe or 0,
+        m.cash or 0,
+        m.debt or 0,
+        price,
+        m.fair_value or price,
+        m.profit_margin or 0,
+        m.ps_ratio or 0,
+        m.fcf or 0,
+        m.market_cap or 0,
+    )
     
-    roa = data.get('roa', 0) or 0
-    roe = data.get('roe', 0) or 0
-    cash = data.get('cash', 0) or 0
-    debt = data.get('debt', 0) or 0
-    price = data.get('price', 0) or 0
-    fair_value = data.get('fair_value', price) or price
-    profit_margin = data.get('profit_margin', 0) or 0
-    ps_ratio = data.get('ps_ratio', 0) or 0
-    fcf = data.get('fcf', 0) or 0
+    checks = []
+    for check, tier, points, value in results:
+        passed, label = CHECK_LABELS[check][tier]
+        checks.append({'pass': passed, 'text': label(value), 'points': points, 'max': CHECK_MAX[check]})
+    return score, checks
+
+def _score_kernel(roa_pct, roe_pct, cash, debt, price, fair_value, pm_pct, ps_ratio, fcf, market_cap):
+    """Numeric half of calculate_score - no string work.
+    Returns (score, [(check, tier, points, value), ...]) with tiers indexing CHECK_LABELS."""
+    score = 0
+    results = []
     
     # ROA check (max 15) - proportional scale
     # Target: 15%+ = full points, scales down linearly to 0 at -5%
-    roa_pct = to_pct(roa)
     roa_pts = max(0, min(15, int((roa_pct + 5) * 15 / 20)))  # -5% -> 0pts, 15% -> 15pts
     score += roa_pts
-    if roa_pct >= 10:
-        checks.append({'pass': True, 'text': f'ROA ({roa_pct:.1f}%) excellent', 'points': roa_pts, 'max': 15})
-    elif roa_pct >= 5:
-        checks.append({'pass': 'warn', 'text': f'ROA ({roa_pct:.1f}%) decent', 'points': roa_pts, 'max': 15})
-    else:
-        checks.append({'pass': False, 'text': f'ROA ({roa_pct:.1f}%) weak', 'points': roa_pts, 'max': 15})
+    results.append(('roa', 0 if roa_pct >= 10 else 1 if roa_pct >= 5 else 2, roa_pts, roa_pct))
     
     # ROE check (max 15) - proportional scale
     # Target: 15%+ = full points, scales down to 0 at -5%
-    roe_pct = to_pct(roe)
     roe_pts = max(0, min(15, int((roe_pct + 5) * 15 / 20)))
     score += roe_pts
-    if roe_pct >= 10:
-        checks.append({'pass': True, 'text': f'ROE ({roe_pct:.1f}%) excellent', 'points': roe_pts, 'max': 15})
-    elif roe_pct >= 5:
-        checks.append({'pass': 'warn', 'text': f'ROE ({roe_pct:.1f}%) decent', 'points': roe_pts, 'max': 15})
-    else:
-        checks.append({'pass': False, 'text': f'ROE ({roe_pct:.1f}%) weak', 'points': roe_pts, 'max': 15})
+    results.append(('roe', 0 if roe_pct >= 10 else 1 if roe_pct >= 5 else 2, roe_pts, roe_pct))
     
     # Cash vs Debt (max 15) - proportional based on coverage ratio
     if debt > 0:
-        coverage = cash / debt if debt > 0 else 10  # cash/debt ratio
+        coverage = cash / debt  # cash/debt ratio
         # 2x coverage = full points, 0x = 0 points
         debt_pts = max(0, min(15, int(coverage * 7.5)))
         score += debt_pts
-        if coverage >= 1:
-            checks.append({'pass': True, 'text': f'Cash covers {coverage:.1f}x debt', 'points': debt_pts, 'max': 15})
-        elif coverage >= 0.5:
-            checks.append({'pass': 'warn', 'text': f'Cash covers {coverage:.1f}x debt', 'points': debt_pts, 'max': 15})
-        else:
-            checks.append({'pass': False, 'text': f'Cash only {coverage:.1f}x debt', 'points': debt_pts, 'max': 15})
+        results.append(('debt', 0 if coverage >= 1 else 1 if coverage >= 0.5 else 2, debt_pts, coverage))
     elif cash > 0:
         score += 15
-        checks.append({'pass': True, 'text': f'Cash (${format_number(cash)}) & minimal debt', 'points': 15, 'max': 15})
+        results.append(('debt', 3, 15, cash))
     else:
-        checks.append({'pass': 'warn', 'text': 'Cash/Debt data limited', 'points': 0, 'max': 15})
+        results.append(('debt', 4, 0, 0))
     
     # Fair value (max 20) - proportional based on upside
     if price > 0 and fair_value > 0:
@@ -269,137 +502,315 @@ def calculate_score(data):
         value_pts = max(0, min(20, int(upside * 0.4)))
         score += value_pts
         if upside > 30:
-            checks.append({'pass': True, 'text': f'{upside:.0f}% undervalued', 'points': value_pts, 'max': 20})
+            results.append(('value', 0, value_pts, upside))
         elif upside > 10:
-            checks.append({'pass': 'warn', 'text': f'{upside:.0f}% below fair value', 'points': value_pts, 'max': 20})
+            results.append(('value', 1, value_pts, upside))
         elif upside > 0:
-            checks.append({'pass': 'warn', 'text': f'{upside:.0f}% near fair value', 'points': value_pts, 'max': 20})
+            results.append(('value', 2, value_pts, upside))
         else:
-            checks.append({'pass': False, 'text': f'Overvalued by {abs(upside):.0f}%', 'points': 0, 'max': 20})
+            results.append(('value', 3, 0, upside))
     
     # Profit margin (max 10) - proportional scale
     # 20%+ = full points, scales to 0 at -5%
-    pm_pct = to_pct(profit_margin)
     pm_pts = max(0, min(10, int((pm_pct + 5) * 10 / 25)))
     score += pm_pts
     if pm_pct >= 15:
-        checks.append({'pass': True, 'text': f'Strong margin ({pm_pct:.1f}%)', 'points': pm_pts, 'max': 10})
+        results.append(('margin', 0, pm_pts, pm_pct))
     elif pm_pct >= 5:
-        checks.append({'pass': 'warn', 'text': f'Margin ({pm_pct:.1f}%)', 'points': pm_pts, 'max': 10})
+        results.append(('margin', 1, pm_pts, pm_pct))
     elif pm_pct > 0:
-        checks.append({'pass': 'warn', 'text': f'Thin margin ({pm_pct:.1f}%)', 'points': pm_pts, 'max': 10})
+        results.append(('margin', 2, pm_pts, pm_pct))
     else:
-        checks.append({'pass': False, 'text': f'Negative margin ({pm_pct:.1f}%)', 'points': 0, 'max': 10})
+        results.append(('margin', 3, 0, pm_pct))
     
     # P/S ratio (max 10) - proportional (lower is better)
     # P/S < 1 = full 10pts, P/S 5+ = 0pts
     if ps_ratio > 0:
         ps_pts = max(0, min(10, int((5 - ps_ratio) * 2.5)))
         score += ps_pts
-        if ps_ratio < 1:
-            checks.append({'pass': True, 'text': f'P/S ({ps_ratio:.2f}x) very attractive', 'points': ps_pts, 'max': 10})
-        elif ps_ratio < 2:
-            checks.append({'pass': True, 'text': f'P/S ({ps_ratio:.2f}x) attractive', 'points': ps_pts, 'max': 10})
-        elif ps_ratio < 4:
-            checks.append({'pass': 'warn', 'text': f'P/S ({ps_ratio:.2f}x) moderate', 'points': ps_pts, 'max': 10})
-        else:
-            checks.append({'pass': False, 'text': f'P/S ({ps_ratio:.2f}x) expensive', 'points': ps_pts, 'max': 10})
+        tier = 0 if ps_ratio < 1 else 1 if ps_ratio < 2 else 2 if ps_ratio < 4 else 3
+        results.append(('ps', tier, ps_pts, ps_ratio))
     
     # FCF (max 15) - proportional based on FCF yield (FCF / market cap)
-    market_cap = data.get('market_cap', 0) or 0
     if fcf > 0 and market_cap > 0:
         fcf_yield = (fcf / market_cap) * 100
         # 10%+ yield = full points, 0% = 0 points
         fcf_pts = max(0, min(15, int(fcf_yield * 1.5)))
         score += fcf_pts
-        if fcf_yield >= 5:
-            checks.append({'pass': True, 'text': f'Strong FCF yield ({fcf_yield:.1f}%)', 'points': fcf_pts, 'max': 15})
-        elif fcf_yield >= 2:
-            checks.append({'pass': True, 'text': f'Positive FCF yield ({fcf_yield:.1f}%)', 'points': fcf_pts, 'max': 15})
-        else:
-            checks.append({'pass': 'warn', 'text': f'Low FCF yield ({fcf_yield:.1f}%)', 'points': fcf_pts, 'max': 15})
+        results.append(('fcf', 0 if fcf_yield >= 5 else 1 if fcf_yield >= 2 else 2, fcf_pts, fcf_yield))
     elif fcf > 0:
         score += 10
-        checks.append({'pass': True, 'text': f'Positive FCF (${format_number(fcf)})', 'points': 10, 'max': 15})
+        results.append(('fcf', 3, 10, fcf))
     else:
-        checks.append({'pass': False, 'text': 'Negative/no FCF', 'points': 0, 'max': 15})
+        results.append(('fcf', 4, 0, 0))
     
-    return score, checks
+    return score, results
+
+# Built once and shared between responses - callers must not mutate them
+REC_STRONG_BUY = {'signal': 'STRONG BUY', 'color': '#00d374', 'reason': 'High score + undervalued'}
+REC_BUY = {'signal': 'BUY', 'color': '#00d374', 'reason': 'Good fundamentals, undervalued'}
+REC_HOLD = {'signal': 'HOLD', 'color': '#ffb800', 'reason': 'Decent fundamentals'}
+REC_WATCH = {'signal': 'WATCH', 'color': '#ffb800', 'reason': 'Some concerns'}
+REC_AVOID = {'signal': 'AVOID', 'color': '#ff5252', 'reason': 'Does not meet criteria'}
 
 def get_recommendation(score, upside):
+    """Returns one of the shared REC_* dicts (read-only)"""
     if score >= 70 and upside > 30:
-        return {'signal': 'STRONG BUY', 'color': '#00d374', 'reason': 'High score + undervalued'}
+        return REC_STRONG_BUY
     elif score >= 60 and upside > 15:
-        return {'signal': 'BUY', 'color': '#00d374', 'reason': 'Good fundamentals, undervalued'}
+        return REC_BUY
     elif score >= 50 and upside > 0:
-        return {'signal': 'HOLD', 'color': '#ffb800', 'reason': 'Decent fundamentals'}
+        return REC_HOLD
     elif score >= 40:
-        return {'signal': 'WATCH', 'color': '#ffb800', 'reason': 'Some concerns'}
+        return REC_WATCH
     else:
-        return {'signal': 'AVOID', 'color': '#ff5252', 'reason': 'Does not meet criteria'}
+        return REC_AVOID
+
+# Bodies smaller than this aren't worth the gzip header overhead
+GZIP_MIN_BYTES = 1024
+
+def accepts_gzip(accept_encoding):
+    """True when an Accept-Encoding header allows gzip, by name or via '*'.
+    A q-value of 0 (e.g. 'gzip;q=0') refuses it."""
+    qvalues = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.partition(';')
+        q = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qvalues[coding.strip().lower()] = q
+    return qvalues.get('gzip', qvalues.get('*', 0.0)) > 0
+# Seconds a client may reuse a response before revalidating with If-None-Match
+CLIENT_MAX_AGE = 60
+# Per-request timestamps, left out of the ETag so unchanged data keeps its tag
+_TIMESTAMP_FIELD_RE = re.compile(rb'"timestamp": ?"[^"]*"')
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match check: '*' or any tag in the comma-separated list equal to etag.
+    Weak comparison - a W/ prefix on either side is ignored."""
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for tag in if_none_match.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        if tag == opaque:
+            return True
+    return False
 
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        raw_input = self.path.split('/')[-1].split('?')[0]
-        raw_input_decoded = urllib.parse.unquote(raw_input)
-        symbol = raw_input_decoded.upper().strip()
+        path, _, query_string = self.path.partition('?')
+        # ?symbols=AAPL,MSFT batches on any analyze URL, including bare /api/analyze
+        if 'symbols=' in query_string:
+            requested = urllib.parse.parse_qs(query_string).get('symbols')
+            if requested:
+                self._send_batch(analyze_many(','.join(requested)))
+                return
         
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
+        raw_input = path.rpartition('/')[2]
+        # Plain tickers carry no escapes - skip the unquote pass
+        raw_input_decoded = urllib.parse.unquote(raw_input) if '%' in raw_input else raw_input
+        
+        # Comma list (AAPL,MSFT,GOOG) -> one response with every analysis.
+        # Only when every part is a ticker - names like "Apple, Inc." stay single.
+        if ',' in raw_input_decoded and is_ticker_list(raw_input_decoded):
+            self._send_batch(analyze_many(raw_input_decoded))
+            return
+        
+        symbol = lookup_company(raw_input_decoded) or raw_input_decoded.upper().strip()
         
         try:
-            # Step 1: Try direct yfinance lookup with the input as-is
-            info = try_yfinance(symbol)
-            
-            # Step 2: If that fails, search Yahoo Finance to resolve the name
-            resolved_name = None
+            # Step 1: Try direct yfinance lookup with the input as-is.
+            # Input that can't be a ticker skips it and goes straight to search.
+            info = cached_info(symbol)
             if info is None:
-                resolved_sym, resolved_name = resolve_symbol(raw_input_decoded)
-                if resolved_sym:
-                    symbol = resolved_sym.upper()
+                if _TICKER_RE.match(symbol):
                     info = try_yfinance(symbol)
+                
+                # Step 2: If that fails, resolve the name to a ticker. Only on a
+                # miss, so a found ticker costs a single Yahoo request.
+                if info is None:
+                    try:
+                        resolved_sym, _ = _EXECUTOR.submit(resolve_symbol, raw_input_decoded).result(timeout=RESOLVE_TIMEOUT)
+                    except FutureTimeout:
+                        resolved_sym = None
+                    if resolved_sym and resolved_sym.upper() != symbol:
+                        symbol = resolved_sym.upper()
+                        info = try_yfinance(symbol)
             
             # Step 3: If still nothing, give up with helpful error
             if info is None:
-                self.wfile.write(json.dumps({
+                self._send_json({
                     'error': f'Could not find "{raw_input_decoded}". Try a ticker symbol like AAPL, TSLA, or MSFT.',
                     'symbol': symbol
-                }).encode())
+                })
                 return
             
-            # Detect asset type
-            quote_type = info.get('quoteType', 'EQUITY')
-            is_etf = quote_type == 'ETF'
-            
-            # Extract price
-            price = safe_get(info, 'currentPrice') or safe_get(info, 'regularMarketPrice') or safe_get(info, 'navPrice', 0)
-            
-            if is_etf:
-                # === ETF-specific analysis ===
-                result = build_etf_result(symbol, info, price)
-            else:
-                # === Stock analysis ===
-                result = build_stock_result(symbol, info, price)
-            
-            self.wfile.write(json.dumps(result).encode())
+            self._send_json(build_result(symbol, info), cacheable=True)
             
         except Exception as e:
-            self.wfile.write(json.dumps({
+            self._send_json({
                 'error': str(e),
                 'symbol': symbol
-            }).encode())
+            })
+    
+    def _send_batch(self, payload):
+        """Send an analyze_many payload - client-cacheable only if every symbol succeeded"""
+        self._send_json(payload, cacheable=not any('error' in r for r in payload['results']))
+    
+    def _send_json(self, payload, cacheable=False):
+        """Serialize, gzip when the client accepts it, and send with an explicit Content-Length.
+        Cacheable (successful) payloads get an ETag and answer 304 with no body when the
+        client already holds the same data; everything else is sent no-store."""
+        body = _dumps(payload)
+        etag = None
+        if cacheable:
+            # Weak tag: the gzip and identity encodings share it
+            etag = 'W/"%s"' % hashlib.blake2b(_TIMESTAMP_FIELD_RE.sub(b'', body), digest_size=16).hexdigest()
+        if etag and etag_matches(self.headers.get('If-None-Match', ''), etag):
+            self.send_response(304)
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self._send_cache_headers(etag)
+            self.end_headers()
+            return
+        
+        compress = len(body) >= GZIP_MIN_BYTES and accepts_gzip(self.headers.get('Accept-Encoding', ''))
+        if compress:
+            body = gzip.compress(body, compresslevel=1)
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self._send_cache_headers(etag)
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def _send_cache_headers(self, etag):
+        """Client caching headers; etag None means the payload must not be reused"""
+        self.send_header('Vary', 'Accept-Encoding')
+        if etag is None:
+            self.send_header('Cache-Control', 'no-store')
+            return
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f'private, max-age={CLIENT_MAX_AGE}')
+
+# Most symbols analyzed in one comma-list request
+MAX_BATCH_SYMBOLS = 20
+
+def analyze_many(query):
+    """Analyze a comma-separated symbol list, fetching info concurrently.
+    Returns {'results': [...]} in request order; misses and timeouts become error entries."""
+    symbols = []
+    for part in query.split(','):
+        part = part.strip()
+        if part:
+            symbols.append(lookup_company(part) or part.upper())
+    symbols = list(dict.fromkeys(symbols))[:MAX_BATCH_SYMBOLS]
+    
+    infos = try_yfinance_many(symbols)
+    results = []
+    for symbol in symbols:
+        if symbol not in infos:
+            results.append({'error': f'Timed out fetching "{symbol}". Try again.', 'symbol': symbol})
+            continue
+        info = infos[symbol]
+        if info is None:
+            results.append({'error': f'Could not find "{symbol}".', 'symbol': symbol})
+            continue
+        try:
+            results.append(build_result(symbol, info))
+        except Exception as e:
+            results.append({'error': str(e), 'symbol': symbol})
+    return {'results': results}
+
+def build_result(symbol, info):
+    """Analyze one symbol's info dict as an ETF or a stock."""
+    # Detect asset type
+    quote_type = info.get('quoteType', 'EQUITY')
+    is_etf = quote_type == 'ETF'
+    
+    # Extract price
+    price = info.get('currentPrice') or info.get('regularMarketPrice') or info.get('navPrice') or 0
+    
+    if is_etf:
+        # === ETF-specific analysis ===
+        return build_etf_result(symbol, info, price)
+    # === Stock analysis ===
+    return build_stock_result(symbol, info, price)
+
+# ETF checklist tiers per check: (below, rows). A value matches the first row whose
+# bound it is under (below=True) or over (below=False); a None bound always matches.
+# Rows are (bound, points, pass, text).
+ETF_TIERS = {
+    'expense': (True, (
+        (0.1, 20, True, lambda v: f'Very low expense ratio ({v:.2f}%)'),
+        (0.5, 15, True, lambda v: f'Low expense ratio ({v:.2f}%)'),
+        (1.0, 5, 'warn', lambda v: f'Moderate expense ratio ({v:.2f}%)'),
+        (None, 0, False, lambda v: f'High expense ratio ({v:.2f}%)'),
+    )),
+    'yield': (False, (
+        (3, 15, True, lambda v: f'Strong yield ({v:.2f}%)'),
+        (1, 10, True, lambda v: f'Decent yield ({v:.2f}%)'),
+        (None, 5, 'warn', lambda v: f'Low yield ({v:.2f}%)'),
+    )),
+    'return_3y': (False, (
+        (10, 20, True, lambda v: f'Strong 3yr avg return ({v:.1f}%)'),
+        (5, 10, 'warn', lambda v: f'Moderate 3yr avg return ({v:.1f}%)'),
+        (0, 5, 'warn', lambda v: f'Low 3yr avg return ({v:.1f}%)'),
+        (None, 0, False, lambda v: f'Negative 3yr return ({v:.1f}%)'),
+    )),
+    'return_5y': (False, (
+        (10, 15, True, lambda v: f'Strong 5yr avg return ({v:.1f}%)'),
+        (5, 10, 'warn', lambda v: f'Moderate 5yr avg return ({v:.1f}%)'),
+        (None, 0, False, lambda v: f'Weak 5yr avg return ({v:.1f}%)'),
+    )),
+    'beta': (True, (
+        (1.0, 10, True, lambda v: f'Low volatility (beta {v:.2f})'),
+        (1.3, 5, 'warn', lambda v: f'Moderate volatility (beta {v:.2f})'),
+        (None, 0, False, lambda v: f'High volatility (beta {v:.2f})'),
+    )),
+    'assets': (False, (
+        (1e9, 10, True, lambda v: f'Large fund (${format_number(v)})'),
+        (100e6, 5, 'warn', lambda v: f'Mid-size fund (${format_number(v)})'),
+        (None, 0, False, lambda v: f'Small fund (${format_number(v)})'),
+    )),
+}
+
+def _etf_check(check, value):
+    """Score one ETF metric against ETF_TIERS. Returns (points, checklist entry)."""
+    below, rows = ETF_TIERS[check]
+    for bound, points, passed, label in rows:
+        if bound is None or (value < bound if below else value > bound):
+            return points, {'pass': passed, 'text': label(value)}
+
+# Info keys build_etf_result reads, in unpacking order (missing -> None)
+ETF_INFO_KEYS = (
+    'annualReportExpenseRatio', 'totalAssets', 'ytdReturn', 'threeYearAverageReturn',
+    'fiveYearAverageReturn', 'yield', 'dividendYield', 'beta3Year', 'beta',
+    'fiftyTwoWeekHigh', 'fiftyTwoWeekLow', 'longName', 'shortName',
+    'regularMarketChangePercent', 'trailingPE',
+)
 
 def build_etf_result(symbol, info, price):
     """Build analysis result for an ETF."""
-    expense_ratio = safe_get(info, 'annualReportExpenseRatio', None)
-    total_assets = safe_get(info, 'totalAssets', 0)
-    ytd_return = safe_get(info, 'ytdReturn', None)
-    three_yr_return = safe_get(info, 'threeYearAverageReturn', None)
-    five_yr_return = safe_get(info, 'fiveYearAverageReturn', None)
-    dividend_yield = safe_get(info, 'yield', None) or safe_get(info, 'dividendYield', None)
-    beta = safe_get(info, 'beta3Year', None) or safe_get(info, 'beta', None)
+    (expense_ratio, total_assets, ytd_return, three_yr_return, five_yr_return,
+     etf_yield, dividend_yield, beta_3y, beta, week_52_high, week_52_low,
+     long_name, short_name, change_pct, pe_ratio) = map(info.get, ETF_INFO_KEYS)
+    # safe_get defaults, applied inline
+    if total_assets is None:
+        total_assets = 0
+    dividend_yield = etf_yield or dividend_yield
+    beta = beta_3y or beta
     
     # ETF scoring
     score = 0
@@ -408,102 +819,68 @@ def build_etf_result(symbol, info, price):
     # Expense ratio
     if expense_ratio is not None:
         er_pct = expense_ratio * 100 if expense_ratio < 1 else expense_ratio
-        if er_pct < 0.1:
-            score += 20
-            checks.append({'pass': True, 'text': f'Very low expense ratio ({er_pct:.2f}%)'})
-        elif er_pct < 0.5:
-            score += 15
-            checks.append({'pass': True, 'text': f'Low expense ratio ({er_pct:.2f}%)'})
-        elif er_pct < 1.0:
-            score += 5
-            checks.append({'pass': 'warn', 'text': f'Moderate expense ratio ({er_pct:.2f}%)'})
-        else:
-            checks.append({'pass': False, 'text': f'High expense ratio ({er_pct:.2f}%)'})
+        points, check = _etf_check('expense', er_pct)
+        score += points
+        checks.append(check)
     else:
         checks.append({'pass': 'warn', 'text': 'Expense ratio data unavailable'})
     
     # Dividend yield
     if dividend_yield is not None and dividend_yield > 0:
         dy_pct = dividend_yield * 100 if dividend_yield < 1 else dividend_yield
-        if dy_pct > 3:
-            score += 15
-            checks.append({'pass': True, 'text': f'Strong yield ({dy_pct:.2f}%)'})
-        elif dy_pct > 1:
-            score += 10
-            checks.append({'pass': True, 'text': f'Decent yield ({dy_pct:.2f}%)'})
-        else:
-            score += 5
-            checks.append({'pass': 'warn', 'text': f'Low yield ({dy_pct:.2f}%)'})
+        points, check = _etf_check('yield', dy_pct)
+        score += points
+        checks.append(check)
     else:
         checks.append({'pass': 'warn', 'text': 'No dividend yield'})
     
     # 3-year return
     if three_yr_return is not None:
         ret_pct = three_yr_return * 100 if abs(three_yr_return) < 5 else three_yr_return
-        if ret_pct > 10:
-            score += 20
-            checks.append({'pass': True, 'text': f'Strong 3yr avg return ({ret_pct:.1f}%)'})
-        elif ret_pct > 5:
-            score += 10
-            checks.append({'pass': 'warn', 'text': f'Moderate 3yr avg return ({ret_pct:.1f}%)'})
-        elif ret_pct > 0:
-            score += 5
-            checks.append({'pass': 'warn', 'text': f'Low 3yr avg return ({ret_pct:.1f}%)'})
-        else:
-            checks.append({'pass': False, 'text': f'Negative 3yr return ({ret_pct:.1f}%)'})
+        points, check = _etf_check('return_3y', ret_pct)
+        score += points
+        checks.append(check)
     else:
         checks.append({'pass': 'warn', 'text': '3yr return data unavailable'})
     
     # 5-year return
     if five_yr_return is not None:
         ret_pct = five_yr_return * 100 if abs(five_yr_return) < 5 else five_yr_return
-        if ret_pct > 10:
-            score += 15
-            checks.append({'pass': True, 'text': f'Strong 5yr avg return ({ret_pct:.1f}%)'})
-        elif ret_pct > 5:
-            score += 10
-            checks.append({'pass': 'warn', 'text': f'Moderate 5yr avg return ({ret_pct:.1f}%)'})
-        else:
-            checks.append({'pass': False, 'text': f'Weak 5yr avg return ({ret_pct:.1f}%)'})
+        points, check = _etf_check('return_5y', ret_pct)
+        score += points
+        checks.append(check)
     
     # Beta (risk)
     if beta is not None and beta > 0:
-        if beta < 1.0:
-            score += 10
-            checks.append({'pass': True, 'text': f'Low volatility (beta {beta:.2f})'})
-        elif beta < 1.3:
-            score += 5
-            checks.append({'pass': 'warn', 'text': f'Moderate volatility (beta {beta:.2f})'})
-        else:
-            checks.append({'pass': False, 'text': f'High volatility (beta {beta:.2f})'})
+        points, check = _etf_check('beta', beta)
+        score += points
+        checks.append(check)
     
     # Total assets (liquidity)
-    if total_assets and total_assets > 1e9:
-        score += 10
-        checks.append({'pass': True, 'text': f'Large fund (${format_number(total_assets)})'})
-    elif total_assets and total_assets > 100e6:
-        score += 5
-        checks.append({'pass': 'warn', 'text': f'Mid-size fund (${format_number(total_assets)})'})
-    elif total_assets:
-        checks.append({'pass': False, 'text': f'Small fund (${format_number(total_assets)})'})
+    if total_assets:
+        points, check = _etf_check('assets', total_assets)
+        score += points
+        checks.append(check)
 
     # Cap score at 100
     score = min(score, 100)
     
     # Fair value for ETFs - use 52-week average or NAV
-    week_52_high = safe_get(info, 'fiftyTwoWeekHigh', price)
-    week_52_low = safe_get(info, 'fiftyTwoWeekLow', price)
+    if week_52_high is None:
+        week_52_high = price
+    if week_52_low is None:
+        week_52_low = price
     fair_value = (week_52_high + week_52_low) / 2 if week_52_high and week_52_low else price
     upside = ((fair_value - price) / price * 100) if price > 0 else 0
     
     return {
         'symbol': symbol,
         'is_etf': True,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso(),
         'quote': {
-            'name': safe_get(info, 'longName') or safe_get(info, 'shortName', symbol),
+            'name': long_name or (symbol if short_name is None else short_name),
             'price': price,
-            'change_percent': safe_get(info, 'regularMarketChangePercent', 0),
+            'change_percent': 0 if change_pct is None else change_pct,
             'market_cap': total_assets,
             'week_52_high': week_52_high,
             'week_52_low': week_52_low,
@@ -511,7 +888,7 @@ def build_etf_result(symbol, info, price):
             'sector': 'ETF',
         },
         'fundamentals': {
-            'pe_ratio': safe_get(info, 'trailingPE', None),
+            'pe_ratio': pe_ratio,
             'expense_ratio': round(expense_ratio * 100, 3) if expense_ratio and expense_ratio < 1 else expense_ratio,
             'dividend_yield': round(dividend_yield * 100, 2) if dividend_yield and dividend_yield < 1 else dividend_yield,
             'ytd_return': round(ytd_return * 100, 1) if ytd_return and abs(ytd_return) < 5 else ytd_return,
@@ -527,39 +904,79 @@ def build_etf_result(symbol, info, price):
         'recommendation': get_recommendation(score, upside),
     }
 
+# Fallback PE multiple by sector name: Yahoo's names, plus the GICS names
+# (Discretionary/Staples) for its two consumer sectors. scan, recommend and
+# discover carry identical copies - keep all four in sync.
+SECTOR_PE = {
+    'Technology': 25,
+    'Consumer Cyclical': 20,
+    'Consumer Defensive': 20,
+    'Consumer Discretionary': 20,
+    'Consumer Staples': 20,
+}
+DEFAULT_SECTOR_PE = 18
+
+# Metrics fields after price, in declaration order: (field, info key, default when missing or None)
+STOCK_DATA_FIELDS = (
+    ('roa', 'returnOnAssets', None),
+    ('roe', 'returnOnEquity', None),
+    ('cash', 'totalCash', 0),
+    ('debt', 'totalDebt', 0),
+    ('profit_margin', 'profitMargins', None),
+    ('ps_ratio', 'priceToSalesTrailing12Months', 0),
+    ('fcf', 'freeCashflow', 0),
+    ('eps', 'trailingEps', 0),
+    ('market_cap', 'marketCap', 0),
+)
+# Yahoo ratios stored on Metrics as percentages, converted once here
+PERCENT_FIELDS = frozenset(('roa', 'roe', 'profit_margin'))
+# Remaining info keys build_stock_result reads, in unpacking order (missing -> None)
+STOCK_INFO_KEYS = (
+    'trailingPE', 'forwardPE', 'targetMeanPrice', 'earningsGrowth', 'revenueGrowth',
+    'earningsQuarterlyGrowth', 'grossMargins', 'dividendYield', 'sector', 'industry',
+    'shortName', 'regularMarketChangePercent', 'fiftyTwoWeekHigh', 'fiftyTwoWeekLow',
+    'longName', 'priceToBook', 'pegRatio',
+)
+
 def build_stock_result(symbol, info, price):
     """Build analysis result for a regular stock."""
-    data = {
-        'price': price,
-        'roa': safe_get(info, 'returnOnAssets', None),
-        'roe': safe_get(info, 'returnOnEquity', None),
-        'cash': safe_get(info, 'totalCash', 0),
-        'debt': safe_get(info, 'totalDebt', 0),
-        'profit_margin': safe_get(info, 'profitMargins', None),
-        'ps_ratio': safe_get(info, 'priceToSalesTrailing12Months', 0),
-        'fcf': safe_get(info, 'freeCashflow', 0),
-        'eps': safe_get(info, 'trailingEps', 0),
-        'market_cap': safe_get(info, 'marketCap', 0),
-    }
+    # Same None -> default rule as safe_get, without a call per field
+    values = []
+    for key, source, default in STOCK_DATA_FIELDS:
+        val = info.get(source)
+        if val is None:
+            val = default
+        elif key in PERCENT_FIELDS:
+            val = to_pct(val)
+        values.append(val)
+    m = Metrics(price, *values)
+    
+    # Every other info key this function reads, fetched in one C-level pass
+    (pe_ratio, forward_pe, target_price, earnings_growth, rev_growth,
+     quarterly_growth, gm_raw, dividend_yield, sector, industry, short_name,
+     change_pct, week_52_high, week_52_low, long_name, pb_ratio,
+     peg_ratio) = map(info.get, STOCK_INFO_KEYS)
+    forward_pe = forward_pe or 0
+    target_price = target_price or 0
     
     # Calculate fair value with component tracking
-    eps = data['eps']
-    pe = safe_get(info, 'trailingPE', 0)
-    forward_pe = safe_get(info, 'forwardPE', 0)
-    target_price = safe_get(info, 'targetMeanPrice', 0)
-    earnings_growth = info.get('earningsGrowth')
+    eps = m.eps
+    pe = pe_ratio or 0
     
-    fair_values = []
+    fv_sum = 0.0
+    fv_n = 0
     fair_value_components = []
     
     if target_price and target_price > 0:
-        fair_values.append(target_price)
+        fv_sum += target_price
+        fv_n += 1
         fair_value_components.append({'label': 'Analyst Consensus Target', 'value': round(target_price, 2)})
     
     if forward_pe and forward_pe > 0 and eps and eps > 0:
         growth_pe = min(forward_pe * 1.2, 30)
         fv = eps * growth_pe
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
         fair_value_components.append({'label': f'Forward PE Model (EPS \u00d7 {growth_pe:.1f})', 'value': round(fv, 2)})
     
     # Growth-adjusted PE fair value (PEG-based)
@@ -569,83 +986,74 @@ def build_stock_result(symbol, info, price):
         fair_pe_from_growth = min(growth_pct * 1.0, 40)
         fv = eps * fair_pe_from_growth
         if fv > 0:
-            fair_values.append(fv)
+            fv_sum += fv
+            fv_n += 1
             fair_value_components.append({'label': f'PEG Model (EPS \u00d7 {fair_pe_from_growth:.0f} growth-PE)', 'value': round(fv, 2)})
     
     if pe and pe > 0 and pe < 25 and price > 0:
         fv = price * 1.1
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
         fair_value_components.append({'label': 'Low PE Premium (+10%)', 'value': round(fv, 2)})
     elif pe and pe > 25 and price > 0:
         fv = price * 0.95
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
         fair_value_components.append({'label': 'High PE Discount (-5%)', 'value': round(fv, 2)})
     
-    if eps and eps > 0 and not fair_values:
-        sector = safe_get(info, 'sector', '')
-        if 'Technology' in str(sector):
-            mult = 25
-        elif 'Consumer' in str(sector):
-            mult = 20
-        else:
-            mult = 18
+    if eps and eps > 0 and fv_n == 0:
+        mult = SECTOR_PE.get(sector, DEFAULT_SECTOR_PE)
         fv = eps * mult
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
         fair_value_components.append({'label': f'Sector PE Model (EPS \u00d7 {mult})', 'value': round(fv, 2)})
     
-    fair_value = sum(fair_values) / len(fair_values) if fair_values else price
-    data['fair_value'] = fair_value
+    fair_value = fv_sum / fv_n if fv_n else price
+    m.fair_value = fair_value
     
-    score, checks = calculate_score(data)
+    score, checks = calculate_score(m)
     upside = ((fair_value - price) / price * 100) if price > 0 else 0
     
     # Growth & Trend data
-    rev_growth = info.get('revenueGrowth')
-    earn_growth = info.get('earningsGrowth')
-    quarterly_growth = info.get('earningsQuarterlyGrowth')
     rev_growth_pct = to_pct(rev_growth) if rev_growth is not None else None
-    earn_growth_pct = to_pct(earn_growth) if earn_growth is not None else None
+    earn_growth_pct = to_pct(earnings_growth) if earnings_growth is not None else None
     quarterly_growth_pct = to_pct(quarterly_growth) if quarterly_growth is not None else None
     
     # Rule #1 Analysis
-    rule1 = calculate_rule1(info, price)
+    rule1 = calculate_rule1(info, price, rev_growth_pct, earn_growth_pct, quarterly_growth_pct, m.roe)
     
     # Build fundamentals - use None for truly missing data so frontend shows N/A
-    roa_val = to_pct(data['roa']) if data['roa'] is not None else None
-    roe_val = to_pct(data['roe']) if data['roe'] is not None else None
-    pm_val = to_pct(data['profit_margin']) if data['profit_margin'] is not None else None
-    gm_raw = safe_get(info, 'grossMargins', None)
     gm_val = to_pct(gm_raw) if gm_raw is not None else None
     
     return {
         'symbol': symbol,
         'is_etf': False,
-        'timestamp': datetime.now().isoformat(),
+        'timestamp': now_iso(),
         'quote': {
-            'name': safe_get(info, 'longName') or safe_get(info, 'shortName', symbol),
+            'name': long_name or (symbol if short_name is None else short_name),
             'price': price,
-            'change_percent': safe_get(info, 'regularMarketChangePercent', 0),
-            'market_cap': safe_get(info, 'marketCap', 0),
-            'week_52_high': safe_get(info, 'fiftyTwoWeekHigh', 0),
-            'week_52_low': safe_get(info, 'fiftyTwoWeekLow', 0),
-            'industry': safe_get(info, 'industry', 'N/A'),
-            'sector': safe_get(info, 'sector', 'N/A'),
+            'change_percent': 0 if change_pct is None else change_pct,
+            'market_cap': m.market_cap,
+            'week_52_high': 0 if week_52_high is None else week_52_high,
+            'week_52_low': 0 if week_52_low is None else week_52_low,
+            'industry': 'N/A' if industry is None else industry,
+            'sector': 'N/A' if sector is None else sector,
         },
         'fundamentals': {
-            'pe_ratio': safe_get(info, 'trailingPE', None),
+            'pe_ratio': pe_ratio,
             'forward_pe': forward_pe or None,
-            'ps_ratio': data['ps_ratio'] or None,
-            'pb_ratio': safe_get(info, 'priceToBook', None),
-            'peg_ratio': safe_get(info, 'pegRatio', None),
-            'eps': data['eps'] or None,
-            'roa': roa_val,
-            'roe': roe_val,
-            'profit_margin': pm_val,
+            'ps_ratio': m.ps_ratio or None,
+            'pb_ratio': pb_ratio,
+            'peg_ratio': peg_ratio,
+            'eps': m.eps or None,
+            'roa': m.roa,
+            'roe': m.roe,
+            'profit_margin': m.profit_margin,
             'gross_margin': gm_val,
-            'cash': data['cash'] or None,
-            'debt': data['debt'] or None,
-            'fcf': data['fcf'] or None,
-            'dividend_yield': to_pct(safe_get(info, 'dividendYield', None)) if info.get('dividendYield') else None,
+            'cash': m.cash or None,
+            'debt': m.debt or None,
+            'fcf': m.fcf or None,
+            'dividend_yield': to_pct(dividend_yield) if dividend_yield else None,
         },
         'growth': {
             'revenue': round(rev_growth_pct, 1) if rev_growth_pct is not None else None,
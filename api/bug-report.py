@@ -3,16 +3,19 @@ from http.server import BaseHTTPRequestHandler
 import json
 import os
 from datetime import datetime
+import urllib3
 
 FORMSPREE_ID = os.environ.get('FORMSPREE_ID', '') or 'meelqaqa'
+FORMSPREE_TIMEOUT = 10  # seconds
+
+# Reused across warm invocations - one keep-alive connection to Formspree
+_POOL = urllib3.PoolManager(num_pools=1, maxsize=2)
 
 class handler(BaseHTTPRequestHandler):
     def do_POST(self):
         self.send_response(200)
         self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self._send_cors_headers()
         self.end_headers()
         
         try:
@@ -40,18 +43,20 @@ class handler(BaseHTTPRequestHandler):
             email_error = None
             fid = FORMSPREE_ID
             try:
-                import urllib.request
                 formspree_data = json.dumps({
                     'message': f"BUG REPORT\n\n{message}\n\nPage: {page}\nTime: {timestamp}",
                     '_subject': 'Bosdet Labs Bug Report'
                 }).encode()
                 
-                req = urllib.request.Request(
+                resp = _POOL.request(
+                    'POST',
                     f'https://formspree.io/f/{fid}',
-                    data=formspree_data,
-                    headers={'Content-Type': 'application/json', 'Accept': 'application/json'}
+                    body=formspree_data,
+                    headers={'Content-Type': 'application/json', 'Accept': 'application/json'},
+                    timeout=FORMSPREE_TIMEOUT,
                 )
-                urllib.request.urlopen(req, timeout=10)
+                if resp.status >= 400:
+                    raise RuntimeError(f'HTTP Error {resp.status}: {resp.reason}')
                 email_sent = True
             except Exception as email_err:
                 email_error = str(email_err)
@@ -65,7 +70,10 @@ class handler(BaseHTTPRequestHandler):
     
     def do_OPTIONS(self):
         self.send_response(200)
+        self._send_cors_headers()
+        self.end_headers()
+
+    def _send_cors_headers(self):
         self.send_header('Access-Control-Allow-Origin', '*')
         self.send_header('Access-Control-Allow-Methods', 'POST, OPTIONS')
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
-        self.end_headers()
@@ -2,8 +2,41 @@
 from http.server import BaseHTTPRequestHandler
 import json
 import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import yfinance as yf
+
+try:
+    from orjson import dumps as _dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
+# Info cache and worker pool - identical to api/scan.py
+INFO_CACHE_TTL = 300  # seconds
+CACHE_MAX = 512
+_info_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+def get_info(symbol):
+    """Cached yf.Ticker(symbol).info"""
+    with _cache_lock:
+        cached = _info_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < INFO_CACHE_TTL:
+            _info_cache.move_to_end(symbol)
+            return cached[1]
+    import yfinance as yf
+    info = yf.Ticker(symbol).info
+    if info:
+        with _cache_lock:
+            _info_cache[symbol] = (time.monotonic(), info)
+            _info_cache.move_to_end(symbol)
+            if len(_info_cache) > CACHE_MAX:
+                _info_cache.popitem(last=False)
+    return info
 
 # Diverse pool of ~200 stocks across sectors
 STOCK_POOLS = {
@@ -19,6 +52,10 @@ STOCK_POOLS = {
     'international_adr': ['TSM', 'BABA', 'NVO', 'ASML', 'TM', 'SONY', 'SAP', 'MELI', 'SE', 'NU', 'GLOB', 'WIX', 'GRAB', 'CPNG', 'JD', 'PDD', 'BIDU', 'NIO', 'LI', 'XPEV'],
 }
 
+# Flattened once at import: pool keys in order, and their display labels
+_SECTORS = tuple(STOCK_POOLS)
+_SECTOR_LABELS = {sector: sector.replace('_', ' ').title() for sector in _SECTORS}
+
 
 def safe_get(info, key, default=0):
     val = info.get(key)
@@ -29,24 +66,22 @@ def to_pct(val):
     """Convert yfinance decimal ratio to percentage - SAME as analyze endpoint."""
     if val is None:
         return 0
-    val = float(val)
-    if abs(val) > 10:
+    if val.__class__ is not float:
+        val = float(val)
+    if val > 10 or val < -10:
         return val
     return val * 100
 
 
-def format_number(n):
-    if n is None or n == 0:
-        return '0'
-    n = float(n)
-    if abs(n) >= 1e12:
-        return f'{n/1e12:.1f}T'
-    if abs(n) >= 1e9:
-        return f'{n/1e9:.1f}B'
-    if abs(n) >= 1e6:
-        return f'{n/1e6:.0f}M'
-    return f'{n:.0f}'
-
+# Fallback PE multiple by sector - kept identical to api/analyze/[symbol].py
+SECTOR_PE = {
+    'Technology': 25,
+    'Consumer Cyclical': 20,
+    'Consumer Defensive': 20,
+    'Consumer Discretionary': 20,
+    'Consumer Staples': 20,
+}
+DEFAULT_SECTOR_PE = 18
 
 def calculate_fair_value(info, price):
     """Calculate blended fair value - SAME logic as analyze endpoint."""
@@ -55,14 +90,17 @@ def calculate_fair_value(info, price):
     forward_pe = safe_get(info, 'forwardPE', 0)
     target_price = safe_get(info, 'targetMeanPrice', 0)
 
-    fair_values = []
+    fv_sum = 0.0
+    fv_n = 0
 
     if target_price and target_price > 0:
-        fair_values.append(target_price)
+        fv_sum += target_price
+        fv_n += 1
 
     if forward_pe and forward_pe > 0 and eps and eps > 0:
         growth_pe = min(forward_pe * 1.2, 30)
-        fair_values.append(eps * growth_pe)
+        fv_sum += eps * growth_pe
+        fv_n += 1
 
     # Growth-adjusted PE fair value (PEG-based)
     earnings_growth = info.get('earningsGrowth')
@@ -72,23 +110,21 @@ def calculate_fair_value(info, price):
         fair_pe_from_growth = min(growth_pct * 1.0, 40)
         fv = eps * fair_pe_from_growth
         if fv > 0:
-            fair_values.append(fv)
+            fv_sum += fv
+            fv_n += 1
 
     if pe and pe > 0 and pe < 25 and price > 0:
-        fair_values.append(price * 1.1)
+        fv_sum += price * 1.1
+        fv_n += 1
     elif pe and pe > 25 and price > 0:
-        fair_values.append(price * 0.95)
+        fv_sum += price * 0.95
+        fv_n += 1
 
-    if eps and eps > 0 and not fair_values:
-        sector = safe_get(info, 'sector', '')
-        if 'Technology' in str(sector):
-            fair_values.append(eps * 25)
-        elif 'Consumer' in str(sector):
-            fair_values.append(eps * 20)
-        else:
-            fair_values.append(eps * 18)
+    if eps and eps > 0 and fv_n == 0:
+        fv_sum += eps * SECTOR_PE.get(info.get('sector'), DEFAULT_SECTOR_PE)
+        fv_n += 1
 
-    return sum(fair_values) / len(fair_values) if fair_values else price
+    return fv_sum / fv_n if fv_n else price
 
 
 def calculate_score(data):
@@ -146,87 +182,94 @@ def calculate_score(data):
     return min(score, 100)
 
 
+def score_pick(symbol, sector):
+    """Fetch and score one discovery pick. Returns its feed entry, or None to skip it."""
+    try:
+        info = get_info(symbol)
+
+        if not info:
+            return None
+
+        price = info.get('currentPrice') or info.get('regularMarketPrice') or 0
+        if price == 0:
+            return None
+
+        roa = safe_get(info, 'returnOnAssets', None)
+        roe = safe_get(info, 'returnOnEquity', None)
+        cash = safe_get(info, 'totalCash', 0)
+        debt = safe_get(info, 'totalDebt', 0)
+        fcf = safe_get(info, 'freeCashflow', 0)
+        pe = safe_get(info, 'trailingPE', 0)
+        ps = safe_get(info, 'priceToSalesTrailing12Months', 0)
+        pm = safe_get(info, 'profitMargins', None)
+
+        # Calculate blended fair value (same as analyze endpoint)
+        fair_value = calculate_fair_value(info, price)
+        upside = ((fair_value - price) / price * 100) if price > 0 else 0
+
+        # Calculate score using the SAME function as analyze endpoint
+        score_data = {
+            'roa': roa,
+            'roe': roe,
+            'cash': cash,
+            'debt': debt,
+            'price': price,
+            'fair_value': fair_value,
+            'profit_margin': pm,
+            'ps_ratio': ps,
+            'fcf': fcf,
+        }
+        score = calculate_score(score_data)
+
+        roa_pct = to_pct(roa) if roa is not None else None
+        roe_pct = to_pct(roe) if roe is not None else None
+
+        return {
+            'symbol': symbol,
+            'name': safe_get(info, 'longName') or safe_get(info, 'shortName', symbol),
+            'price': round(price, 2),
+            'score': score,
+            'upside': round(upside, 1),
+            'sector': safe_get(info, 'sector', _SECTOR_LABELS[sector]),
+            'industry': safe_get(info, 'industry', ''),
+            'market_cap': safe_get(info, 'marketCap', 0),
+            'pe_ratio': round(pe, 1) if pe else None,
+            'roa': round(roa_pct, 1) if roa_pct is not None else None,
+            'roe': round(roe_pct, 1) if roe_pct is not None else None,
+            'dividend_yield': round(to_pct(safe_get(info, 'dividendYield', None)), 2) if info.get('dividendYield') else None,
+        }
+
+    except Exception as e:
+        print(f"Error scanning {symbol}: {e}")
+    return None
+
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'application/json')
-        self.send_header('Access-Control-Allow-Origin', '*')
-        self.end_headers()
-
         # Pick 7 stocks from different random sectors, keep top 5 by score
-        sectors = random.sample(list(STOCK_POOLS.keys()), min(7, len(STOCK_POOLS)))
+        sectors = random.sample(_SECTORS, min(7, len(_SECTORS)))
         picks = []
         for sector in sectors:
             stock = random.choice(STOCK_POOLS[sector])
             picks.append((stock, sector))
 
-        results = []
-        for symbol, sector in picks:
-            try:
-                stock = yf.Ticker(symbol)
-                info = stock.info
-
-                if not info:
-                    continue
-
-                price = safe_get(info, 'currentPrice') or safe_get(info, 'regularMarketPrice', 0)
-                if price == 0:
-                    continue
-
-                roa = safe_get(info, 'returnOnAssets', None)
-                roe = safe_get(info, 'returnOnEquity', None)
-                cash = safe_get(info, 'totalCash', 0)
-                debt = safe_get(info, 'totalDebt', 0)
-                fcf = safe_get(info, 'freeCashflow', 0)
-                pe = safe_get(info, 'trailingPE', 0)
-                ps = safe_get(info, 'priceToSalesTrailing12Months', 0)
-                pm = safe_get(info, 'profitMargins', None)
-
-                # Calculate blended fair value (same as analyze endpoint)
-                fair_value = calculate_fair_value(info, price)
-                upside = ((fair_value - price) / price * 100) if price > 0 else 0
-
-                # Calculate score using the SAME function as analyze endpoint
-                score_data = {
-                    'roa': roa,
-                    'roe': roe,
-                    'cash': cash,
-                    'debt': debt,
-                    'price': price,
-                    'fair_value': fair_value,
-                    'profit_margin': pm,
-                    'ps_ratio': ps,
-                    'fcf': fcf,
-                }
-                score = calculate_score(score_data)
-
-                roa_pct = to_pct(roa) if roa is not None else None
-                roe_pct = to_pct(roe) if roe is not None else None
-                sector_label = sector.replace('_', ' ').title()
-
-                results.append({
-                    'symbol': symbol,
-                    'name': safe_get(info, 'longName') or safe_get(info, 'shortName', symbol),
-                    'price': round(price, 2),
-                    'score': score,
-                    'upside': round(upside, 1),
-                    'sector': safe_get(info, 'sector', sector_label),
-                    'industry': safe_get(info, 'industry', ''),
-                    'market_cap': safe_get(info, 'marketCap', 0),
-                    'pe_ratio': round(pe, 1) if pe else None,
-                    'roa': round(roa_pct, 1) if roa_pct is not None else None,
-                    'roe': round(roe_pct, 1) if roe_pct is not None else None,
-                    'dividend_yield': round(to_pct(safe_get(info, 'dividendYield', None)), 2) if info.get('dividendYield') else None,
-                })
-
-            except Exception as e:
-                print(f"Error scanning {symbol}: {e}")
+        symbols, pick_sectors = zip(*picks)
+        results = [entry for entry in _EXECUTOR.map(score_pick, symbols, pick_sectors) if entry is not None]
 
         # Sort by score descending and keep top 5 for feed
         results.sort(key=lambda x: x['score'], reverse=True)
         results = results[:5]
 
-        self.wfile.write(json.dumps({
+        self._send_body(200, _dumps({
             'picks': results,
             'timestamp': datetime.now().isoformat(),
-        }).encode())
+        }))
+
+    def _send_body(self, status, body):
+        """Send an already-serialized JSON body with an explicit Content-Length."""
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
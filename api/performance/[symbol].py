@@ -13,8 +13,8 @@ class handler(BaseHTTPRequestHandler):
         self.end_headers()
 
         # Extract symbol from path
-        path = self.path.split('?')[0]
-        symbol = path.rstrip('/').split('/')[-1].upper()
+        path = self.path.partition('?')[0]
+        symbol = path.rstrip('/').rpartition('/')[2].upper()
 
         if not symbol or len(symbol) > 10:
             self.wfile.write(json.dumps({'error': 'Invalid symbol'}).encode())
@@ -4,8 +4,12 @@ from http.server import BaseHTTPRequestHandler
 import json
 import os
 import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-import yfinance as yf
+from itertools import repeat
 
 # Large universe of quality candidates across sectors
 STOCK_POOLS = {
@@ -26,6 +30,30 @@ for sector, tickers in STOCK_POOLS.items():
         ALL_CANDIDATES.append((t, sector))
 
 
+# Info cache and worker pool - identical to api/scan.py
+INFO_CACHE_TTL = 300  # seconds
+CACHE_MAX = 512
+_info_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+def get_info(symbol):
+    """Cached yf.Ticker(symbol).info"""
+    with _cache_lock:
+        cached = _info_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < INFO_CACHE_TTL:
+            _info_cache.move_to_end(symbol)
+            return cached[1]
+    import yfinance as yf
+    info = yf.Ticker(symbol).info
+    if info:
+        with _cache_lock:
+            _info_cache[symbol] = (time.monotonic(), info)
+            _info_cache.move_to_end(symbol)
+            if len(_info_cache) > CACHE_MAX:
+                _info_cache.popitem(last=False)
+    return info
+
 def safe_get(info, key, default=0):
     val = info.get(key)
     return val if val is not None else default
@@ -34,8 +62,9 @@ def safe_get(info, key, default=0):
 def to_pct(val):
     if val is None:
         return None
-    val = float(val)
-    if abs(val) > 10:
+    if val.__class__ is not float:
+        val = float(val)
+    if val > 10 or val < -10:
         return val
     return val * 100
 
@@ -56,6 +85,9 @@ def calculate_roic(info):
     return (net_income / invested_capital) * 100
 
 
+# Rule #1 minimum acceptable return: 15%/yr over 10 years
+DISCOUNT_10Y = 1.15 ** 10
+
 def calculate_sticker_price(info, price):
     """Phil Town's Rule #1 Sticker Price.
     Sticker = EPS × (1+g)^10 × min(2g, 50) / 1.15^10
@@ -94,7 +126,7 @@ def calculate_sticker_price(info, price):
     future_eps = eps * (1 + growth_rate) ** 10
     future_pe = min(2 * growth_rate * 100, 50)
     future_price = future_eps * future_pe
-    sticker_price = future_price / (1.15 ** 10)
+    sticker_price = future_price / DISCOUNT_10Y
     mos_price = sticker_price / 2
 
     return {
@@ -104,6 +136,16 @@ def calculate_sticker_price(info, price):
     }
 
 
+# Fallback PE multiple by sector - kept identical to api/analyze/[symbol].py
+SECTOR_PE = {
+    'Technology': 25,
+    'Consumer Cyclical': 20,
+    'Consumer Defensive': 20,
+    'Consumer Discretionary': 20,
+    'Consumer Staples': 20,
+}
+DEFAULT_SECTOR_PE = 18
+
 def calculate_fair_value_and_upside(info, price):
     """Calculate fair value using the EXACT same logic as analyze API."""
     eps = safe_get(info, 'trailingEps', 0)
@@ -112,15 +154,18 @@ def calculate_fair_value_and_upside(info, price):
     target_price = safe_get(info, 'targetMeanPrice', 0)
     earnings_growth = info.get('earningsGrowth')
     
-    fair_values = []
+    fv_sum = 0.0
+    fv_n = 0
     
     if target_price and target_price > 0:
-        fair_values.append(target_price)
+        fv_sum += target_price
+        fv_n += 1
     
     if forward_pe and forward_pe > 0 and eps and eps > 0:
         growth_pe = min(forward_pe * 1.2, 30)
         fv = eps * growth_pe
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
     
     # Growth-adjusted PE fair value (PEG-based)
     if earnings_growth and float(earnings_growth) > 0 and eps and eps > 0:
@@ -129,27 +174,24 @@ def calculate_fair_value_and_upside(info, price):
         fair_pe_from_growth = min(growth_pct * 1.0, 40)
         fv = eps * fair_pe_from_growth
         if fv > 0:
-            fair_values.append(fv)
+            fv_sum += fv
+            fv_n += 1
     
     if pe and pe > 0 and pe < 25 and price > 0:
         fv = price * 1.1
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
     elif pe and pe > 25 and price > 0:
         fv = price * 0.95
-        fair_values.append(fv)
+        fv_sum += fv
+        fv_n += 1
     
-    if eps and eps > 0 and not fair_values:
-        sector = safe_get(info, 'sector', '')
-        if 'Technology' in str(sector):
-            mult = 25
-        elif 'Consumer' in str(sector):
-            mult = 20
-        else:
-            mult = 18
-        fv = eps * mult
-        fair_values.append(fv)
+    if eps and eps > 0 and fv_n == 0:
+        fv = eps * SECTOR_PE.get(info.get('sector'), DEFAULT_SECTOR_PE)
+        fv_sum += fv
+        fv_n += 1
     
-    fair_value = sum(fair_values) / len(fair_values) if fair_values else price
+    fair_value = fv_sum / fv_n if fv_n else price
     upside = ((fair_value - price) / price * 100) if price > 0 else 0
     
     return fair_value, upside
@@ -332,6 +374,91 @@ def pick_candidates(profile, max_candidates=20):
     return candidates[:max_candidates]
 
 
+def score_candidate(ticker, sector, profile):
+    """Rule #1 quality + watchlist affinity for one candidate. Returns its entry, or None to skip it."""
+    try:
+        info = get_info(ticker)
+        if not info:
+            return None
+
+        price = info.get('currentPrice') or info.get('regularMarketPrice') or 0
+        if not price:
+            return None
+
+        # Score using Rule #1 principles
+        r1 = rule1_score(info, price)
+        quality_score = r1['score']
+
+        # Only recommend stocks with some Rule #1 merit
+        if quality_score < 25:
+            return None
+
+        # ── ADAPTIVE AFFINITY SCORING ──
+        # Combines Rule #1 quality (60%) with user preference fit (40%)
+        affinity = 0
+        max_affinity = 40
+
+        # Sector affinity (up to 15 pts): weighted by how much user saves from this sector
+        stock_sector = safe_get(info, 'sector', sector)
+        sector_w = profile['sector_weights']
+        best_match = 0
+        for user_sector, weight in sector_w.items():
+            if user_sector.lower() in stock_sector.lower() or stock_sector.lower() in user_sector.lower():
+                best_match = max(best_match, weight)
+        affinity += best_match * 15
+
+        # Score range affinity (up to 10 pts): is this stock's quality near what user tends to save?
+        score_mid = (profile['min_score'] + profile['max_score']) / 2
+        score_range = max(profile['max_score'] - profile['min_score'], 20)
+        score_dist = abs(quality_score - score_mid)
+        if score_dist <= score_range / 2:
+            affinity += 10
+        elif score_dist <= score_range:
+            affinity += 5
+
+        # Price tier affinity (up to 10 pts): does this stock fit user's typical price range?
+        price_mid = profile['avg_price']
+        price_range = max(profile['max_price'] - profile['min_price'], 50)
+        price_dist = abs(price - price_mid)
+        if price_dist <= price_range * 0.5:
+            affinity += 10
+        elif price_dist <= price_range:
+            affinity += 5
+        elif price_dist <= price_range * 2:
+            affinity += 2
+
+        # Diversification bonus (up to 5 pts): if user has few sectors, nudge new ones
+        if stock_sector not in profile['sectors'] and len(profile['sectors']) < 3:
+            affinity += 5
+
+        # Combine: 60% Rule #1 quality + 40% affinity
+        final_score = int(quality_score * 0.6 + min(affinity, max_affinity) * 0.4 / max_affinity * 100 * 0.4)
+
+        # Use the upside calculated in rule1_score (based on fair value, same as analyze API)
+        upside = r1.get('upside', 0)
+
+        return {
+            'symbol': ticker,
+            'name': safe_get(info, 'longName') or safe_get(info, 'shortName', ticker),
+            'sector': stock_sector,
+            'industry': safe_get(info, 'industry', ''),
+            'price': round(price, 2),
+            'score': quality_score,
+            'upside': round(upside, 1),
+            'roic': r1['roic'],
+            'roe': r1['roe'],
+            'revenue_growth': r1['revenue_growth'],
+            'eps_growth': r1['eps_growth'],
+            'has_moat': r1['has_moat'],
+            'mos_price': r1['mos_price'],
+            'market_cap': safe_get(info, 'marketCap', 0),
+            '_final': final_score,
+        }
+
+    except Exception as e:
+        print(f"Recommend error {ticker}: {e}")
+        return None
+
 class handler(BaseHTTPRequestHandler):
     def do_OPTIONS(self):
         self.send_response(200)
@@ -381,90 +508,10 @@ class handler(BaseHTTPRequestHandler):
         candidates = pick_candidates(profile)
 
         recommendations = []
-        for ticker, sector in candidates:
-            try:
-                stock = yf.Ticker(ticker)
-                info = stock.info
-                if not info:
-                    continue
-
-                price = safe_get(info, 'currentPrice') or safe_get(info, 'regularMarketPrice', 0)
-                if not price:
-                    continue
-
-                # Score using Rule #1 principles
-                r1 = rule1_score(info, price)
-                quality_score = r1['score']
-
-                # Only recommend stocks with some Rule #1 merit
-                if quality_score < 25:
-                    continue
-
-                # ── ADAPTIVE AFFINITY SCORING ──
-                # Combines Rule #1 quality (60%) with user preference fit (40%)
-                affinity = 0
-                max_affinity = 40
-
-                # Sector affinity (up to 15 pts): weighted by how much user saves from this sector
-                stock_sector = safe_get(info, 'sector', sector)
-                sector_w = profile['sector_weights']
-                best_match = 0
-                for user_sector, weight in sector_w.items():
-                    if user_sector.lower() in stock_sector.lower() or stock_sector.lower() in user_sector.lower():
-                        best_match = max(best_match, weight)
-                affinity += best_match * 15
-
-                # Score range affinity (up to 10 pts): is this stock's quality near what user tends to save?
-                score_mid = (profile['min_score'] + profile['max_score']) / 2
-                score_range = max(profile['max_score'] - profile['min_score'], 20)
-                score_dist = abs(quality_score - score_mid)
-                if score_dist <= score_range / 2:
-                    affinity += 10
-                elif score_dist <= score_range:
-                    affinity += 5
-
-                # Price tier affinity (up to 10 pts): does this stock fit user's typical price range?
-                price_mid = profile['avg_price']
-                price_range = max(profile['max_price'] - profile['min_price'], 50)
-                price_dist = abs(price - price_mid)
-                if price_dist <= price_range * 0.5:
-                    affinity += 10
-                elif price_dist <= price_range:
-                    affinity += 5
-                elif price_dist <= price_range * 2:
-                    affinity += 2
-
-                # Diversification bonus (up to 5 pts): if user has few sectors, nudge new ones
-                if stock_sector not in profile['sectors'] and len(profile['sectors']) < 3:
-                    affinity += 5
-
-                # Combine: 60% Rule #1 quality + 40% affinity
-                final_score = int(quality_score * 0.6 + min(affinity, max_affinity) * 0.4 / max_affinity * 100 * 0.4)
-
-                # Use the upside calculated in rule1_score (based on fair value, same as analyze API)
-                upside = r1.get('upside', 0)
-
-                recommendations.append({
-                    'symbol': ticker,
-                    'name': safe_get(info, 'longName') or safe_get(info, 'shortName', ticker),
-                    'sector': stock_sector,
-                    'industry': safe_get(info, 'industry', ''),
-                    'price': round(price, 2),
-                    'score': quality_score,
-                    'upside': round(upside, 1),
-                    'roic': r1['roic'],
-                    'roe': r1['roe'],
-                    'revenue_growth': r1['revenue_growth'],
-                    'eps_growth': r1['eps_growth'],
-                    'has_moat': r1['has_moat'],
-                    'mos_price': r1['mos_price'],
-                    'market_cap': safe_get(info, 'marketCap', 0),
-                    '_final': final_score,
-                })
-
-            except Exception as e:
-                print(f"Recommend error {ticker}: {e}")
-                continue
+        tickers, sectors = zip(*candidates) if candidates else ((), ())
+        for entry in _EXECUTOR.map(score_candidate, tickers, sectors, repeat(profile)):
+            if entry is not None:
+                recommendations.append(entry)
 
         # Sort by combined score (Rule #1 quality + affinity), then by upside
         recommendations.sort(key=lambda x: (-x['_final'], -x['score'], -x['upside']))
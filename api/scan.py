@@ -1,9 +1,41 @@
 """Scan stocks using yfinance"""
 from http.server import BaseHTTPRequestHandler
 import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import repeat
 from urllib.parse import parse_qs, urlparse
-import yfinance as yf
+
+# Warm-instance cache: symbol -> (fetched_at, info), LRU-bounded.
+# Only non-empty info dicts are stored, so misses are retried next time.
+# yfinance (pandas/numpy) is imported on first use rather than at load, and
+# _EXECUTOR's threads overlap the network-bound per-symbol fetches.
+# recommend.py and discover.py carry identical copies - keep them in sync.
+INFO_CACHE_TTL = 300  # seconds
+CACHE_MAX = 512
+_info_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=8)
+
+def get_info(symbol):
+    """Cached yf.Ticker(symbol).info"""
+    with _cache_lock:
+        cached = _info_cache.get(symbol)
+        if cached and time.monotonic() - cached[0] < INFO_CACHE_TTL:
+            _info_cache.move_to_end(symbol)
+            return cached[1]
+    import yfinance as yf
+    info = yf.Ticker(symbol).info
+    if info:
+        with _cache_lock:
+            _info_cache[symbol] = (time.monotonic(), info)
+            _info_cache.move_to_end(symbol)
+            if len(_info_cache) > CACHE_MAX:
+                _info_cache.popitem(last=False)
+    return info
 
 def safe_get(info, key, default=0):
     val = info.get(key)
@@ -12,41 +44,53 @@ def safe_get(info, key, default=0):
 def to_pct(val):
     if val is None:
         return 0
-    val = float(val)
-    if abs(val) > 10:
+    if val.__class__ is not float:
+        val = float(val)
+    if val > 10 or val < -10:
         return val
     return val * 100
 
+# Fallback PE multiple by sector - kept identical to api/analyze/[symbol].py
+SECTOR_PE = {
+    'Technology': 25,
+    'Consumer Cyclical': 20,
+    'Consumer Defensive': 20,
+    'Consumer Discretionary': 20,
+    'Consumer Staples': 20,
+}
+DEFAULT_SECTOR_PE = 18
+
 def calculate_fair_value(info, price):
     eps = safe_get(info, 'trailingEps', 0)
     pe = safe_get(info, 'trailingPE', 0)
     forward_pe = safe_get(info, 'forwardPE', 0)
     target_price = safe_get(info, 'targetMeanPrice', 0)
     earnings_growth = info.get('earningsGrowth')
-    fair_values = []
+    fv_sum = 0.0
+    fv_n = 0
     if target_price and target_price > 0:
-        fair_values.append(target_price)
+        fv_sum += target_price
+        fv_n += 1
     if forward_pe and forward_pe > 0 and eps and eps > 0:
-        fair_values.append(eps * min(forward_pe * 1.2, 30))
+        fv_sum += eps * min(forward_pe * 1.2, 30)
+        fv_n += 1
     if earnings_growth and float(earnings_growth) > 0 and eps and eps > 0:
         eg = float(earnings_growth)
         gp = eg * 100 if eg < 1 else eg
         fv = eps * min(gp, 40)
         if fv > 0:
-            fair_values.append(fv)
+            fv_sum += fv
+            fv_n += 1
     if pe and pe > 0 and pe < 25 and price > 0:
-        fair_values.append(price * 1.1)
+        fv_sum += price * 1.1
+        fv_n += 1
     elif pe and pe > 25 and price > 0:
-        fair_values.append(price * 0.95)
-    if eps and eps > 0 and not fair_values:
-        sector = safe_get(info, 'sector', '')
-        if 'Technology' in str(sector):
-            fair_values.append(eps * 25)
-        elif 'Consumer' in str(sector):
-            fair_values.append(eps * 20)
-        else:
-            fair_values.append(eps * 18)
-    return sum(fair_values) / len(fair_values) if fair_values else price
+        fv_sum += price * 0.95
+        fv_n += 1
+    if eps and eps > 0 and fv_n == 0:
+        fv_sum += eps * SECTOR_PE.get(info.get('sector'), DEFAULT_SECTOR_PE)
+        fv_n += 1
+    return fv_sum / fv_n if fv_n else price
 
 def calculate_score(info, price, fair_value):
     """Proportional scoring - points scale with how well each metric performs"""
@@ -233,6 +277,67 @@ def get_score_for_algo(info, price, fair_value, algo):
         return calculate_score(info, price, fair_value)
 
 
+def scan_symbol(symbol, algo):
+    """Score one ticker for the scan list. Returns its opportunity entry, or None to skip it."""
+    import yfinance as yf
+    try:
+        info = get_info(symbol)
+
+        if not info:
+            # Still try to get basic price from history
+            hist = yf.Ticker(symbol).history(period='5d')
+            if not hist.empty:
+                price = float(hist['Close'].iloc[-1])
+                return {
+                    'symbol': symbol,
+                    'name': symbol,
+                    'price': round(price, 2),
+                    'score': 50,  # Default score
+                    'upside': 0,
+                }
+            return None
+
+        price = info.get('currentPrice') or info.get('regularMarketPrice') or 0
+        if price == 0:
+            # Try history as fallback
+            hist = yf.Ticker(symbol).history(period='5d')
+            if not hist.empty:
+                price = float(hist['Close'].iloc[-1])
+
+        if price == 0:
+            return None
+
+        fair_value = calculate_fair_value(info, price)
+        score = get_score_for_algo(info, price, fair_value, algo)
+        upside = ((fair_value - price) / price * 100) if price > 0 else 0
+
+        return {
+            'symbol': symbol,
+            'name': safe_get(info, 'longName') or safe_get(info, 'shortName', symbol),
+            'price': round(price, 2),
+            'score': score,
+            'upside': round(upside, 1),
+        }
+
+    except Exception as e:
+        print(f"Error {symbol}: {e}")
+        # On error, still try to add with minimal data
+        try:
+            stock = yf.Ticker(symbol)
+            hist = stock.history(period='5d')
+            if not hist.empty:
+                price = float(hist['Close'].iloc[-1])
+                return {
+                    'symbol': symbol,
+                    'name': symbol,
+                    'price': round(price, 2),
+                    'score': 50,
+                    'upside': 0,
+                }
+        except:
+            pass
+    return None
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         self.send_response(200)
@@ -254,64 +359,9 @@ class handler(BaseHTTPRequestHandler):
         
         opportunities = []
         
-        for symbol in tickers:
-            try:
-                stock = yf.Ticker(symbol)
-                info = stock.info
-                
-                if not info:
-                    # Still try to get basic price from history
-                    hist = stock.history(period='5d')
-                    if not hist.empty:
-                        price = float(hist['Close'].iloc[-1])
-                        opportunities.append({
-                            'symbol': symbol,
-                            'name': symbol,
-                            'price': round(price, 2),
-                            'score': 50,  # Default score
-                            'upside': 0,
-                        })
-                    continue
-                
-                price = safe_get(info, 'currentPrice') or safe_get(info, 'regularMarketPrice', 0)
-                if price == 0:
-                    # Try history as fallback
-                    hist = stock.history(period='5d')
-                    if not hist.empty:
-                        price = float(hist['Close'].iloc[-1])
-                
-                if price == 0:
-                    continue
-                
-                fair_value = calculate_fair_value(info, price)
-                score = get_score_for_algo(info, price, fair_value, algo)
-                upside = ((fair_value - price) / price * 100) if price > 0 else 0
-                
-                opportunities.append({
-                    'symbol': symbol,
-                    'name': safe_get(info, 'longName') or safe_get(info, 'shortName', symbol),
-                    'price': round(price, 2),
-                    'score': score,
-                    'upside': round(upside, 1),
-                })
-                
-            except Exception as e:
-                print(f"Error {symbol}: {e}")
-                # On error, still try to add with minimal data
-                try:
-                    stock = yf.Ticker(symbol)
-                    hist = stock.history(period='5d')
-                    if not hist.empty:
-                        price = float(hist['Close'].iloc[-1])
-                        opportunities.append({
-                            'symbol': symbol,
-                            'name': symbol,
-                            'price': round(price, 2),
-                            'score': 50,
-                            'upside': 0,
-                        })
-                except:
-                    pass
+        for entry in _EXECUTOR.map(scan_symbol, tickers, repeat(algo)):
+            if entry is not None:
+                opportunities.append(entry)
         
         opportunities.sort(key=lambda x: x['score'], reverse=True)
         
@@ -4,6 +4,12 @@ import json
 import urllib.parse
 import traceback
 
+try:
+    from orjson import dumps as _dumps
+except ImportError:
+    def _dumps(obj):
+        return json.dumps(obj).encode()
+
 def search_with_yfinance(query):
     """Use yfinance.Search to find stocks matching a query. US exchanges only."""
     import yfinance as yf
@@ -52,19 +58,18 @@ def search_with_ticker_validation(query):
         pass
     return results
 
+# Static error body, serialized once
+QUERY_REQUIRED_BODY = _dumps({'error': 'Query required'})
+
 class handler(BaseHTTPRequestHandler):
     def do_GET(self):
         # Extract query from path: /api/search/some%20query
-        path_parts = self.path.split('/')
-        raw_query = path_parts[-1].split('?')[0] if len(path_parts) > 0 else ''
-        query = urllib.parse.unquote(raw_query).strip()
+        raw_query = self.path.partition('?')[0].rpartition('/')[2]
+        # Single-word queries carry no escapes - skip the unquote pass
+        query = (urllib.parse.unquote(raw_query) if '%' in raw_query else raw_query).strip()
 
         if not query:
-            self.send_response(400)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({'error': 'Query required'}).encode())
+            self._send_body(400, QUERY_REQUIRED_BODY)
             return
 
         try:
@@ -75,23 +80,24 @@ class handler(BaseHTTPRequestHandler):
             if not results:
                 results = search_with_ticker_validation(query)
 
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_body(200, _dumps({
                 'query': query,
                 'results': results[:8],
-            }).encode())
+            }))
 
         except Exception as e:
             traceback.print_exc()
-            self.send_response(200)
-            self.send_header('Content-type', 'application/json')
-            self.send_header('Access-Control-Allow-Origin', '*')
-            self.end_headers()
-            self.wfile.write(json.dumps({
+            self._send_body(200, _dumps({
                 'query': query,
                 'results': [],
                 'debug_error': str(e),
-            }).encode())
+            }))
+
+    def _send_body(self, status, body):
+        """Send an already-serialized JSON body with an explicit Content-Length."""
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
@@ -17,7 +17,16 @@ Data Sources:
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import os
+import json
+import hashlib
+import tempfile
+import math
+import functools
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 
@@ -38,11 +47,40 @@ FMP_BASE_URL = 'https://financialmodelingprep.com/api/v3'
 
 # GitHub stock symbols
 GITHUB_STOCKS_URL = 'https://raw.githubusercontent.com/rreichel3/US-Stock-Symbols/main'
+EXCHANGES = ('nasdaq', 'nyse', 'amex')
 
 # Cache for stock data (5 min TTL)
 CACHE_TTL = 300
 _cache = {}
 
+# Upstream API response cache: quotes move intraday, fundamentals don't
+CACHE_TTL_QUOTE = int(os.environ.get('CACHE_TTL_QUOTE', 60))
+CACHE_TTL_FUNDAMENTALS = int(os.environ.get('CACHE_TTL_FUNDAMENTALS', 86400))
+# Upstream responses are also written here so restarts start warm ('' disables)
+API_CACHE_DIR = os.environ.get('API_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'stock_api_cache'))
+
+# (connect, read) seconds for upstream calls - fail fast on a dead host
+UPSTREAM_TIMEOUT = (3.05, 10)
+
+# Shared HTTP session: keep-alive + connection pooling per upstream host
+# (Tradier, FMP, GitHub), so repeat calls skip the TCP/TLS handshake.
+# One retry for GETs that never connected or got a throttled/gateway status;
+# read errors aren't retried, so a slow upstream costs at most one read timeout.
+_session = requests.Session()
+_session.mount('https://', HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=1,
+        connect=1,
+        read=0,
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset(('GET',)),
+        backoff_factor=0.3,
+        raise_on_status=False,
+    ),
+))
+
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
@@ -59,11 +97,66 @@ def set_cached(key, data):
     """Set cache value"""
     _cache[key] = (data, time.time())
 
+def get_stale(key):
+    """Return cached value regardless of age (fallback when upstream fails)"""
+    if key in _cache:
+        return _cache[key][0]
+    return None
+
+def api_cache_key(source, endpoint, params=None):
+    """Cache key for an upstream API call - params sorted so order doesn't matter"""
+    return (source, endpoint, tuple(sorted((params or {}).items())))
+
+def _api_cache_path(key):
+    return os.path.join(API_CACHE_DIR, hashlib.md5(repr(key).encode()).hexdigest() + '.json')
+
+def get_api_cached(key, ttl):
+    """get_cached for upstream responses, falling back to the on-disk copy.
+    A disk hit is loaded into memory even when expired so get_stale can serve it."""
+    cached = get_cached(key, ttl=ttl)
+    if cached is not None or not API_CACHE_DIR or key in _cache:
+        return cached
+    try:
+        with open(_api_cache_path(key)) as f:
+            entry = json.load(f)
+        data, ts = entry['data'], float(entry['ts'])
+    except (OSError, ValueError, KeyError, TypeError):
+        # Missing, unreadable or malformed entry - a plain miss
+        return None
+    _cache[key] = (data, ts)
+    return get_cached(key, ttl=ttl)
+
+def set_api_cached(key, data):
+    """set_cached for upstream responses, persisted to API_CACHE_DIR"""
+    set_cached(key, data)
+    if not API_CACHE_DIR:
+        return
+    path = _api_cache_path(key)
+    try:
+        os.makedirs(API_CACHE_DIR, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file.
+        # mkstemp gives every writer (thread or process) its own temp file.
+        fd, tmp = tempfile.mkstemp(dir=API_CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'ts': _cache[key][1], 'data': data}, f)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+    except OSError as e:
+        print(f"API cache write error: {e}")
+
 def tradier_request(endpoint, params=None):
-    """Make request to Tradier API"""
+    """Make request to Tradier API (cached, stale copy served on upstream errors)"""
     if not TRADIER_API_KEY:
         return None
     
+    cache_key = api_cache_key('tradier', endpoint, params)
+    cached = get_api_cached(cache_key, CACHE_TTL_QUOTE)
+    if cached is not None:
+        return cached
+    
     headers = {
         'Authorization': f'Bearer {TRADIER_API_KEY}',
         'Accept': 'application/json'
@@ -71,28 +164,65 @@ def tradier_request(endpoint, params=None):
     
     try:
         url = f'{TRADIER_BASE_URL}{endpoint}'
-        response = requests.get(url, headers=headers, params=params, timeout=10)
+        response = _session.get(url, headers=headers, params=params, timeout=UPSTREAM_TIMEOUT)
         if response.status_code == 200:
-            return response.json()
+            data = response.json()
+            set_api_cached(cache_key, data)
+            return data
     except Exception as e:
         print(f"Tradier API error: {e}")
-    return None
+    return get_stale(cache_key)
 
 def fmp_request(endpoint, params=None):
-    """Make request to Financial Modeling Prep API"""
+    """Make request to Financial Modeling Prep API (cached, stale copy served on upstream errors)"""
     if not FMP_API_KEY:
         return None
     
+    cache_key = api_cache_key('fmp', endpoint, params)
+    ttl = CACHE_TTL_QUOTE if endpoint.startswith('/quote/') else CACHE_TTL_FUNDAMENTALS
+    cached = get_api_cached(cache_key, ttl)
+    if cached is not None:
+        return cached
+    
     try:
         url = f'{FMP_BASE_URL}{endpoint}'
-        params = params or {}
+        params = dict(params or {})
         params['apikey'] = FMP_API_KEY
-        response = requests.get(url, params=params, timeout=10)
+        response = _session.get(url, params=params, timeout=UPSTREAM_TIMEOUT)
         if response.status_code == 200:
-            return response.json()
+            data = response.json()
+            set_api_cached(cache_key, data)
+            return data
     except Exception as e:
         print(f"FMP API error: {e}")
-    return None
+    return get_stale(cache_key)
+
+# FMP response field -> (fundamentals key, scale). Ratios come back as decimals.
+FMP_RATIO_FIELDS = (
+    ('roa', 'returnOnAssetsTTM', 100),
+    ('roe', 'returnOnEquityTTM', 100),
+    ('profit_margin', 'netProfitMarginTTM', 100),
+    ('gross_margin', 'grossProfitMarginTTM', 100),
+    ('operating_margin', 'operatingProfitMarginTTM', 100),
+    ('ps_ratio', 'priceToSalesRatioTTM', 1),
+    ('pb_ratio', 'priceBookValueRatioTTM', 1),
+    ('pe_ratio', 'peRatioTTM', 1),
+)
+FMP_BALANCE_FIELDS = (
+    ('cash', 'cashAndCashEquivalents', 1),
+    ('debt', 'totalDebt', 1),
+    ('total_assets', 'totalAssets', 1),
+    ('total_equity', 'totalStockholdersEquity', 1),
+)
+FMP_CASHFLOW_FIELDS = (
+    ('fcf', 'freeCashFlow', 1),
+    ('operating_cf', 'operatingCashFlow', 1),
+)
+
+def extract_fields(row, fields, out):
+    """Copy mapped fields from an FMP response row into out (missing -> 0)"""
+    for key, source, scale in fields:
+        out[key] = (row.get(source) or 0) * scale
 
 # =============================================================================
 # MICHAEL'S ANALYSIS ENGINE
@@ -111,19 +241,36 @@ def calculate_investment_score(data):
     
     Returns score (0-100) and checklist items
     """
+    price = data.get('price', 0) or 0
+    score, checks = _score_core(
+        float(data.get('roa', 0) or 0),
+        float(data.get('roe', 0) or 0),
+        float(data.get('cash', 0) or 0),
+        float(data.get('debt', 0) or 0),
+        float(price),
+        optional_float(data.get('fair_value', price)),
+        float(data.get('profit_margin', 0) or 0),
+        float(data.get('ps_ratio', 0) or 0),
+        float(data.get('fcf', 0) or 0),
+    )
+    # Fresh dicts per call - cached checks are shared between callers
+    return score, [dict(c) for c in checks]
+
+def optional_float(value):
+    """float(value), keeping None as the 'unknown' sentinel"""
+    return None if value is None else float(value)
+
+def field_or_default(data, name, default):
+    """data[name], or default when the key is missing or None (FMP sends nulls)"""
+    value = data.get(name)
+    return default if value is None else value
+
+@functools.lru_cache(maxsize=4096)
+def _score_core(roa, roe, cash, debt, price, fair_value, profit_margin, ps_ratio, fcf):
+    """Memoized body of calculate_investment_score - returns (score, tuple of checks)"""
     score = 0
     checks = []
     
-    roa = data.get('roa', 0) or 0
-    roe = data.get('roe', 0) or 0
-    cash = data.get('cash', 0) or 0
-    debt = data.get('debt', 0) or 0
-    price = data.get('price', 0) or 0
-    fair_value = data.get('fair_value', price) or price
-    profit_margin = data.get('profit_margin', 0) or 0
-    ps_ratio = data.get('ps_ratio', 0) or 0
-    fcf = data.get('fcf', 0) or 0
-    
     # ROA check
     if roa > 10:
         score += 15
@@ -152,7 +299,7 @@ def calculate_investment_score(data):
         checks.append({'pass': False, 'text': f'Debt exceeds cash'})
     
     # Fair value check
-    if price > 0 and fair_value > 0:
+    if price > 0 and fair_value is not None and fair_value > 0:
         upside = ((fair_value - price) / price) * 100
         if upside > 30:
             score += 20
@@ -165,6 +312,10 @@ def calculate_investment_score(data):
             checks.append({'pass': 'warn', 'text': f'Near fair value'})
         else:
             checks.append({'pass': False, 'text': f'Overvalued by {abs(upside):.0f}%'})
+    elif price > 0 and fair_value is None:
+        checks.append({'pass': 'warn', 'text': 'Fair value unknown'})
+    elif price > 0:
+        checks.append({'pass': False, 'text': 'No positive fair value'})
     
     # Profit margin
     if profit_margin > 15:
@@ -192,7 +343,55 @@ def calculate_investment_score(data):
     else:
         checks.append({'pass': False, 'text': 'Negative FCF'})
     
-    return score, checks
+    return score, tuple(checks)
+
+# Two-threshold rules shared by the score-only paths (scalar and batch):
+# (field, pass above, partial above, pass points, partial points)
+TIERED_SCORE_RULES = (
+    ('roa', 10, 5, 15, 7),
+    ('roe', 10, 5, 15, 7),
+    ('profit_margin', 15, 5, 10, 5),
+)
+
+def calculate_score_only(data):
+    """Same score as calculate_investment_score, without building checklist text.
+    For callers that only rank symbols (e.g. /api/scan)."""
+    price = data.get('price', 0) or 0
+    return _score_only(
+        float(data.get('roa', 0) or 0),
+        float(data.get('roe', 0) or 0),
+        float(data.get('cash', 0) or 0),
+        float(data.get('debt', 0) or 0),
+        float(price),
+        optional_float(data.get('fair_value', price)),
+        float(data.get('profit_margin', 0) or 0),
+        float(data.get('ps_ratio', 0) or 0),
+        float(data.get('fcf', 0) or 0),
+    )
+
+def _score_only(roa, roe, cash, debt, price, fair_value, profit_margin, ps_ratio, fcf):
+    """Integer-only scoring rules - must stay in sync with _score_core"""
+    score = 0
+    for value, (_, hi, lo, hi_pts, lo_pts) in zip((roa, roe, profit_margin), TIERED_SCORE_RULES):
+        if value > hi:
+            score += hi_pts
+        elif value > lo:
+            score += lo_pts
+    if cash >= debt:
+        score += 15
+    if price > 0 and fair_value is not None and fair_value > 0:
+        upside = ((fair_value - price) / price) * 100
+        if upside > 30:
+            score += 20
+        elif upside > 10:
+            score += 10
+        elif upside > 0:
+            score += 5
+    if 0 < ps_ratio < 2:
+        score += 10
+    if fcf > 0:
+        score += 15
+    return score
 
 def calculate_fair_value(data):
     """
@@ -200,24 +399,31 @@ def calculate_fair_value(data):
     1. DCF (if we have cash flow data)
     2. P/E based (using industry avg PE)
     3. Graham number
+    Returns None when none of the methods have the inputs they need.
     """
-    eps = data.get('eps', 0) or 0
-    book_value = data.get('book_value_per_share', 0) or 0
-    fcf = data.get('fcf', 0) or 0
-    shares = data.get('shares_outstanding', 0) or 0
-    growth_rate = data.get('growth_rate', 0.05)  # Default 5%
-    
-    fair_values = []
+    return _fair_value_core(
+        float(data.get('eps', 0) or 0),
+        float(data.get('book_value_per_share', 0) or 0),
+        float(data.get('fcf', 0) or 0),
+        float(data.get('shares_outstanding', 0) or 0),
+        float(field_or_default(data, 'growth_rate', 0.05)),  # Default 5%
+    )
+
+@functools.lru_cache(maxsize=4096)
+def _fair_value_core(eps, book_value, fcf, shares, growth_rate):
+    """Memoized body of calculate_fair_value"""
+    total = 0.0
+    n_methods = 0
     
     # Method 1: P/E based (industry avg ~ 15)
     if eps > 0:
-        pe_fair_value = eps * 15
-        fair_values.append(pe_fair_value)
-    
-    # Method 2: Graham Number = sqrt(22.5 * EPS * Book Value)
-    if eps > 0 and book_value > 0:
-        graham = (22.5 * eps * book_value) ** 0.5
-        fair_values.append(graham)
+        total += eps * 15
+        n_methods += 1
+        
+        # Method 2: Graham Number = sqrt(22.5 * EPS * Book Value)
+        if book_value > 0:
+            total += (22.5 * eps * book_value) ** 0.5
+            n_methods += 1
     
     # Method 3: Simple DCF (5 years of FCF growth discounted at 10%)
     if fcf > 0 and shares > 0:
@@ -225,50 +431,137 @@ def calculate_fair_value(data):
         terminal_multiple = 12
         fcf_per_share = fcf / shares
         
-        dcf_value = 0
-        for year in range(1, 6):
-            future_fcf = fcf_per_share * ((1 + growth_rate) ** year)
-            dcf_value += future_fcf / ((1 + discount_rate) ** year)
+        # Sum of fcf * q^year for years 1-5, q = (1+g)/(1+r) - closed-form geometric series
+        q = (1 + growth_rate) / (1 + discount_rate)
+        q2 = q * q
+        q5 = q2 * q2 * q  # (1+g)^5 / (1+r)^5, shared with the terminal value
+        if q == 1:
+            dcf_value = fcf_per_share * 5
+        else:
+            dcf_value = fcf_per_share * q * (1 - q5) / (1 - q)
         
         # Terminal value
-        terminal_value = (fcf_per_share * ((1 + growth_rate) ** 5) * terminal_multiple) / ((1 + discount_rate) ** 5)
+        terminal_value = fcf_per_share * q5 * terminal_multiple
         dcf_value += terminal_value
-        fair_values.append(dcf_value)
+        total += dcf_value
+        n_methods += 1
     
-    # Return average of methods
-    if fair_values:
-        return sum(fair_values) / len(fair_values)
+    # Average of methods; no guessing from price when nothing applies
+    if n_methods == 0:
+        return None
+    return total / n_methods
+
+# Batch analysis: one structured-array row per symbol, (field, default) order
+BATCH_FIELDS = (
+    ('price', 0.0),
+    ('roa', 0.0),
+    ('roe', 0.0),
+    ('cash', 0.0),
+    ('debt', 0.0),
+    ('profit_margin', 0.0),
+    ('ps_ratio', 0.0),
+    ('fcf', 0.0),
+    ('eps', 0.0),
+    ('shares_outstanding', 0.0),
+    ('book_value_per_share', 0.0),
+    ('growth_rate', 0.05),
+    ('dcf_value', 0.0),
+    ('fair_value', 0.0),
+)
+BATCH_DTYPE = np.dtype([(name, 'f8') for name, _ in BATCH_FIELDS])
+
+def calculate_fair_value_batch(arr):
+    """Vectorized calculate_fair_value over a BATCH_DTYPE array - NaN where unknown"""
+    eps = arr['eps']
+    book_value = arr['book_value_per_share']
+    fcf = arr['fcf']
+    shares = arr['shares_outstanding']
+    
+    # Method 1: P/E based
+    has_pe = eps > 0
+    total = np.where(has_pe, eps * 15, 0.0)
+    
+    # Method 2: Graham Number
+    has_graham = has_pe & (book_value > 0)
+    total += np.sqrt(np.where(has_graham, 22.5 * eps * book_value, 0.0))
     
-    # Fallback: 1.3x current price
-    return data.get('price', 0) * 1.3
+    # Method 3: DCF - same closed form as the scalar version, discount 10%, terminal 12x
+    has_dcf = (fcf > 0) & (shares > 0)
+    fcf_per_share = np.divide(fcf, shares, out=np.zeros_like(fcf), where=has_dcf)
+    q = (1 + arr['growth_rate']) / 1.10
+    q2 = q * q
+    q5 = q2 * q2 * q
+    flat = q == 1
+    dcf_value = np.where(flat, fcf_per_share * 5, fcf_per_share * q * (1 - q5) / np.where(flat, 1.0, 1 - q))
+    dcf_value += fcf_per_share * q5 * 12
+    total += np.where(has_dcf, dcf_value, 0.0)
+    
+    n_methods = has_pe.astype(int) + has_graham + has_dcf
+    return np.where(n_methods > 0, total / np.maximum(n_methods, 1), np.nan)
+
+def calculate_investment_score_batch(arr):
+    """Vectorized score-only calculate_investment_score over a BATCH_DTYPE array"""
+    price = arr['price']
+    fair_value = arr['fair_value']
+    ps = arr['ps_ratio']
+    
+    score = np.zeros(len(arr), dtype=int)
+    for name, hi, lo, hi_pts, lo_pts in TIERED_SCORE_RULES:
+        values = arr[name]
+        score += np.where(values > hi, hi_pts, np.where(values > lo, lo_pts, 0))
+    score += np.where(arr['cash'] >= arr['debt'], 15, 0)
+    
+    valued = (price > 0) & (fair_value > 0)
+    upside = np.divide(fair_value - price, price, out=np.zeros_like(price), where=valued) * 100
+    score += np.where(valued & (upside > 30), 20,
+                      np.where(valued & (upside > 10), 10,
+                               np.where(valued & (upside > 0), 5, 0)))
+    
+    score += np.where((ps > 0) & (ps < 2), 10, 0)
+    score += np.where(arr['fcf'] > 0, 15, 0)
+    return score
+
+# (divisor, format) per thousands tier: units, K, M, B, T
+_NUMBER_TIERS = ((1.0, '%.0f'), (1e3, '%.0fK'), (1e6, '%.0fM'), (1e9, '%.1fB'), (1e12, '%.1fT'))
 
+@functools.lru_cache(maxsize=1024)
 def format_number(n):
     """Format large numbers with B/M/K suffix"""
     if n is None:
         return '0'
     n = float(n)
-    if abs(n) >= 1e12:
-        return f'{n/1e12:.1f}T'
-    if abs(n) >= 1e9:
-        return f'{n/1e9:.1f}B'
-    if abs(n) >= 1e6:
-        return f'{n/1e6:.0f}M'
-    if abs(n) >= 1e3:
-        return f'{n/1e3:.0f}K'
-    return f'{n:.0f}'
+    a = abs(n)
+    if a >= 1e12:
+        tier = 4
+    elif a >= 1e3:
+        tier = int(math.log10(a)) // 3
+        # log10 can round up just below a power of ten
+        if a < _NUMBER_TIERS[tier][0]:
+            tier -= 1
+    else:
+        tier = 0
+    div, fmt = _NUMBER_TIERS[tier]
+    return fmt % (n / div)
+
+# Built once and shared between responses - callers must not mutate them
+REC_STRONG_BUY = {'signal': 'STRONG BUY', 'color': '#00d374', 'reason': 'High score with significant undervaluation'}
+REC_BUY = {'signal': 'BUY', 'color': '#00d374', 'reason': 'Good fundamentals and undervalued'}
+REC_HOLD = {'signal': 'HOLD', 'color': '#ffb800', 'reason': 'Decent fundamentals, fair price'}
+REC_WATCH = {'signal': 'WATCH', 'color': '#ffb800', 'reason': 'Some concerns, monitor closely'}
+REC_AVOID = {'signal': 'AVOID', 'color': '#ff5252', 'reason': 'Does not meet investment criteria'}
 
 def get_recommendation(score, upside):
-    """Get buy/hold/sell recommendation"""
+    """Get buy/hold/sell recommendation - one of the shared REC_* dicts (read-only)"""
     if score >= 70 and upside > 30:
-        return {'signal': 'STRONG BUY', 'color': '#00d374', 'reason': 'High score with significant undervaluation'}
+        return REC_STRONG_BUY
     elif score >= 60 and upside > 15:
-        return {'signal': 'BUY', 'color': '#00d374', 'reason': 'Good fundamentals and undervalued'}
+        return REC_BUY
     elif score >= 50 and upside > 0:
-        return {'signal': 'HOLD', 'color': '#ffb800', 'reason': 'Decent fundamentals, fair price'}
+        return REC_HOLD
     elif score >= 40:
-        return {'signal': 'WATCH', 'color': '#ffb800', 'reason': 'Some concerns, monitor closely'}
+        return REC_WATCH
     else:
-        return {'signal': 'AVOID', 'color': '#ff5252', 'reason': 'Does not meet investment criteria'}
+        return REC_AVOID
 
 # =============================================================================
 # API ROUTES
@@ -306,6 +599,34 @@ def set_config():
         'fmp_configured': bool(FMP_API_KEY)
     })
 
+def fetch_exchange_tickers(exchange):
+    """Download one exchange's ticker list from GitHub (raises on failure)"""
+    url = f'{GITHUB_STOCKS_URL}/{exchange}/{exchange}_tickers.json'
+    response = _session.get(url, timeout=UPSTREAM_TIMEOUT)
+    if response.status_code != 200:
+        raise RuntimeError(f'Could not download {exchange} tickers (HTTP {response.status_code})')
+    return response.json()
+
+def load_ticker_universe():
+    """All US tickers across EXCHANGES as a frozenset - downloaded at most once a day"""
+    return _load_ticker_universe(int(time.time() // 86400))
+
+@functools.lru_cache(maxsize=1)
+def _load_ticker_universe(day):
+    """Memoized per UTC day; the upstream lists are regenerated daily"""
+    tickers = set()
+    
+    # Download all exchange lists concurrently - wall time is the slowest one.
+    # Any failed exchange raises, and lru_cache doesn't keep exceptions, so a
+    # partial universe is never memoized for the rest of the day.
+    with ThreadPoolExecutor(max_workers=len(EXCHANGES)) as executor:
+        for exchange_tickers in executor.map(fetch_exchange_tickers, EXCHANGES):
+            tickers.update(exchange_tickers)
+    
+    if not tickers:
+        raise RuntimeError('Could not download ticker lists')
+    return frozenset(tickers)
+
 @app.route('/api/tickers')
 def get_tickers():
     """Get all US stock tickers from GitHub"""
@@ -315,13 +636,7 @@ def get_tickers():
         return jsonify(cached)
     
     try:
-        tickers = set()
-        
-        for exchange in ['nasdaq', 'nyse', 'amex']:
-            url = f'{GITHUB_STOCKS_URL}/{exchange}/{exchange}_tickers.json'
-            response = requests.get(url, timeout=10)
-            if response.status_code == 200:
-                tickers.update(response.json())
+        tickers = load_ticker_universe()
         
         result = {
             'tickers': sorted(list(tickers)),
@@ -333,6 +648,41 @@ def get_tickers():
     except Exception as e:
         return jsonify({'error': str(e), 'tickers': []})
 
+def map_tradier_quote(q, symbol):
+    """Normalize a Tradier /markets/quotes entry to our quote fields"""
+    return {
+        'price': q.get('last', 0),
+        'change': q.get('change', 0),
+        'change_percent': q.get('change_percentage', 0),
+        'volume': q.get('volume', 0),
+        'high': q.get('high', 0),
+        'low': q.get('low', 0),
+        'open': q.get('open', 0),
+        'prev_close': q.get('prevclose', 0),
+        'week_52_high': q.get('week_52_high', 0),
+        'week_52_low': q.get('week_52_low', 0),
+        'name': q.get('description', symbol),
+    }
+
+def map_fmp_quote(q, symbol):
+    """Normalize an FMP /quote row to our quote fields"""
+    return {
+        'price': q.get('price', 0),
+        'change': q.get('change', 0),
+        'change_percent': q.get('changesPercentage', 0),
+        'volume': q.get('volume', 0),
+        'high': q.get('dayHigh', 0),
+        'low': q.get('dayLow', 0),
+        'open': q.get('open', 0),
+        'prev_close': q.get('previousClose', 0),
+        'week_52_high': q.get('yearHigh', 0),
+        'week_52_low': q.get('yearLow', 0),
+        'name': q.get('name', symbol),
+        'market_cap': q.get('marketCap', 0),
+        'pe': q.get('pe', 0),
+        'eps': q.get('eps', 0),
+    }
+
 @app.route('/api/quote/<symbol>')
 def get_quote(symbol):
     """Get stock quote from Tradier or FMP"""
@@ -348,21 +698,8 @@ def get_quote(symbol):
     if TRADIER_API_KEY:
         data = tradier_request('/markets/quotes', {'symbols': symbol})
         if data and 'quotes' in data and 'quote' in data['quotes']:
-            q = data['quotes']['quote']
-            result.update({
-                'price': q.get('last', 0),
-                'change': q.get('change', 0),
-                'change_percent': q.get('change_percentage', 0),
-                'volume': q.get('volume', 0),
-                'high': q.get('high', 0),
-                'low': q.get('low', 0),
-                'open': q.get('open', 0),
-                'prev_close': q.get('prevclose', 0),
-                'week_52_high': q.get('week_52_high', 0),
-                'week_52_low': q.get('week_52_low', 0),
-                'name': q.get('description', symbol),
-                'source': 'tradier'
-            })
+            result.update(map_tradier_quote(data['quotes']['quote'], symbol))
+            result['source'] = 'tradier'
             set_cached(cache_key, result)
             return jsonify(result)
     
@@ -370,111 +707,74 @@ def get_quote(symbol):
     if FMP_API_KEY:
         data = fmp_request(f'/quote/{symbol}')
         if data and len(data) > 0:
-            q = data[0]
-            result.update({
-                'price': q.get('price', 0),
-                'change': q.get('change', 0),
-                'change_percent': q.get('changesPercentage', 0),
-                'volume': q.get('volume', 0),
-                'high': q.get('dayHigh', 0),
-                'low': q.get('dayLow', 0),
-                'open': q.get('open', 0),
-                'prev_close': q.get('previousClose', 0),
-                'week_52_high': q.get('yearHigh', 0),
-                'week_52_low': q.get('yearLow', 0),
-                'name': q.get('name', symbol),
-                'market_cap': q.get('marketCap', 0),
-                'pe': q.get('pe', 0),
-                'eps': q.get('eps', 0),
-                'source': 'fmp'
-            })
+            result.update(map_fmp_quote(data[0], symbol))
+            result['source'] = 'fmp'
             set_cached(cache_key, result)
             return jsonify(result)
     
     return jsonify({'error': 'No API key configured', 'symbol': symbol})
 
-@app.route('/api/analyze/<symbol>')
-def analyze_stock(symbol):
-    """
-    Full stock analysis with Michael's criteria
-    Returns fundamentals, fair value, and investment score
-    """
-    symbol = symbol.upper()
-    cache_key = f'analysis_{symbol}'
-    cached = get_cached(cache_key, ttl=300)  # 5 min cache
-    if cached:
-        return jsonify(cached)
-    
-    result = {
-        'symbol': symbol,
-        'timestamp': datetime.now().isoformat(),
-    }
-    
-    # Get quote data
+# FMP fundamentals fetched for every analyzed symbol: (name, endpoint template, params)
+FMP_FUNDAMENTAL_ENDPOINTS = (
+    ('ratios', '/ratios-ttm/{}', None),
+    ('balance', '/balance-sheet-statement/{}', {'limit': 1}),
+    ('cashflow', '/cash-flow-statement/{}', {'limit': 1}),
+    ('profile', '/profile/{}', None),
+    ('dcf', '/discounted-cash-flow/{}', None),
+)
+
+def fetch_stock_data(symbol):
+    """Fetch quote (Tradier, falling back to FMP) and FMP fundamentals for one symbol.
+    Returns (quote, fundamentals)."""
     quote = {'price': 0, 'name': symbol}
     
-    if TRADIER_API_KEY:
-        data = tradier_request('/markets/quotes', {'symbols': symbol})
-        if data and 'quotes' in data and 'quote' in data['quotes']:
-            q = data['quotes']['quote']
-            quote = {
-                'price': q.get('last', 0),
-                'change_percent': q.get('change_percentage', 0),
-                'week_52_high': q.get('week_52_high', 0),
-                'week_52_low': q.get('week_52_low', 0),
-                'name': q.get('description', symbol),
-                'volume': q.get('volume', 0)
+    # The upstream calls are independent - issue them together so the
+    # wait is the slowest response rather than the sum of all of them
+    with ThreadPoolExecutor(max_workers=len(FMP_FUNDAMENTAL_ENDPOINTS) + 1) as executor:
+        tradier_future = None
+        if TRADIER_API_KEY:
+            tradier_future = executor.submit(tradier_request, '/markets/quotes', {'symbols': symbol})
+        fmp_futures = {}
+        if FMP_API_KEY:
+            fmp_futures = {
+                name: executor.submit(fmp_request, endpoint.format(symbol), params)
+                for name, endpoint, params in FMP_FUNDAMENTAL_ENDPOINTS
             }
+            # Without Tradier the FMP quote is certainly needed - fetch it with the rest
+            if not tradier_future:
+                fmp_futures['quote'] = executor.submit(fmp_request, f'/quote/{symbol}')
+    
+    if tradier_future:
+        data = tradier_future.result()
+        if data and 'quotes' in data and 'quote' in data['quotes']:
+            quote = map_tradier_quote(data['quotes']['quote'], symbol)
     
     # Get fundamentals from FMP (required for deep analysis)
     fundamentals = {}
     if FMP_API_KEY:
         # Get quote if we don't have it from Tradier
         if quote['price'] == 0:
-            fmp_quote = fmp_request(f'/quote/{symbol}')
+            fmp_quote = fmp_futures['quote'].result() if 'quote' in fmp_futures else fmp_request(f'/quote/{symbol}')
             if fmp_quote and len(fmp_quote) > 0:
-                q = fmp_quote[0]
-                quote = {
-                    'price': q.get('price', 0),
-                    'change_percent': q.get('changesPercentage', 0),
-                    'week_52_high': q.get('yearHigh', 0),
-                    'week_52_low': q.get('yearLow', 0),
-                    'name': q.get('name', symbol),
-                    'volume': q.get('volume', 0),
-                    'market_cap': q.get('marketCap', 0)
-                }
+                quote = map_fmp_quote(fmp_quote[0], symbol)
         
         # Get ratios
-        ratios = fmp_request(f'/ratios-ttm/{symbol}')
+        ratios = fmp_futures['ratios'].result()
         if ratios and len(ratios) > 0:
-            r = ratios[0]
-            fundamentals['roa'] = (r.get('returnOnAssetsTTM') or 0) * 100
-            fundamentals['roe'] = (r.get('returnOnEquityTTM') or 0) * 100
-            fundamentals['profit_margin'] = (r.get('netProfitMarginTTM') or 0) * 100
-            fundamentals['gross_margin'] = (r.get('grossProfitMarginTTM') or 0) * 100
-            fundamentals['operating_margin'] = (r.get('operatingProfitMarginTTM') or 0) * 100
-            fundamentals['ps_ratio'] = r.get('priceToSalesRatioTTM') or 0
-            fundamentals['pb_ratio'] = r.get('priceBookValueRatioTTM') or 0
-            fundamentals['pe_ratio'] = r.get('peRatioTTM') or 0
+            extract_fields(ratios[0], FMP_RATIO_FIELDS, fundamentals)
         
         # Get balance sheet
-        balance = fmp_request(f'/balance-sheet-statement/{symbol}', {'limit': 1})
+        balance = fmp_futures['balance'].result()
         if balance and len(balance) > 0:
-            b = balance[0]
-            fundamentals['cash'] = b.get('cashAndCashEquivalents') or 0
-            fundamentals['debt'] = b.get('totalDebt') or 0
-            fundamentals['total_assets'] = b.get('totalAssets') or 0
-            fundamentals['total_equity'] = b.get('totalStockholdersEquity') or 0
+            extract_fields(balance[0], FMP_BALANCE_FIELDS, fundamentals)
         
         # Get cash flow
-        cashflow = fmp_request(f'/cash-flow-statement/{symbol}', {'limit': 1})
+        cashflow = fmp_futures['cashflow'].result()
         if cashflow and len(cashflow) > 0:
-            c = cashflow[0]
-            fundamentals['fcf'] = c.get('freeCashFlow') or 0
-            fundamentals['operating_cf'] = c.get('operatingCashFlow') or 0
+            extract_fields(cashflow[0], FMP_CASHFLOW_FIELDS, fundamentals)
         
         # Get profile
-        profile = fmp_request(f'/profile/{symbol}')
+        profile = fmp_futures['profile'].result()
         if profile and len(profile) > 0:
             p = profile[0]
             quote['name'] = p.get('companyName') or quote.get('name', symbol)
@@ -488,12 +788,15 @@ def analyze_stock(symbol):
                 fundamentals['shares_outstanding'] = quote['market_cap'] / quote['price']
         
         # Get DCF value
-        dcf = fmp_request(f'/discounted-cash-flow/{symbol}')
+        dcf = fmp_futures['dcf'].result()
         if dcf and len(dcf) > 0:
             fundamentals['dcf_value'] = dcf[0].get('dcf') or 0
     
-    # Combine data for analysis
-    analysis_data = {
+    return quote, fundamentals
+
+def build_analysis_data(quote, fundamentals):
+    """Combine quote + fundamentals into the flat dict the analysis engine scores"""
+    return {
         'price': quote.get('price', 0),
         'roa': fundamentals.get('roa', 0),
         'roe': fundamentals.get('roe', 0),
@@ -505,6 +808,28 @@ def analyze_stock(symbol):
         'eps': fundamentals.get('eps', 0),
         'shares_outstanding': fundamentals.get('shares_outstanding', 0)
     }
+
+@app.route('/api/analyze/<symbol>')
+def analyze_stock(symbol):
+    """
+    Full stock analysis with Michael's criteria
+    Returns fundamentals, fair value, and investment score
+    """
+    symbol = symbol.upper()
+    cache_key = f'analysis_{symbol}'
+    cached = get_cached(cache_key, ttl=300)  # 5 min cache
+    if cached:
+        return jsonify(cached)
+    
+    result = {
+        'symbol': symbol,
+        'timestamp': datetime.now().isoformat(),
+    }
+    
+    quote, fundamentals = fetch_stock_data(symbol)
+    
+    # Combine data for analysis
+    analysis_data = build_analysis_data(quote, fundamentals)
     
     # Calculate fair value
     fair_value = fundamentals.get('dcf_value') or calculate_fair_value(analysis_data)
@@ -513,14 +838,14 @@ def analyze_stock(symbol):
     # Calculate investment score using Michael's criteria
     score, checks = calculate_investment_score(analysis_data)
     
-    # Calculate upside
+    # Calculate upside (none when fair value is unknown)
     price = quote.get('price', 0)
-    upside = ((fair_value - price) / price * 100) if price > 0 else 0
+    upside = ((fair_value - price) / price * 100) if price > 0 and fair_value is not None else 0
     
     result.update({
         'quote': quote,
         'fundamentals': fundamentals,
-        'fair_value': round(fair_value, 2),
+        'fair_value': round(fair_value, 2) if fair_value is not None else None,
         'upside_percent': round(upside, 1),
         'investment_score': score,
         'checklist': checks,
@@ -530,6 +855,62 @@ def analyze_stock(symbol):
     set_cached(cache_key, result)
     return jsonify(result)
 
+# Symbols fetched at once by /api/analyze-batch. Each fetch_stock_data runs up to
+# 6 upstream calls at once itself, so 4 keeps the total within _session's pool_maxsize (32).
+BATCH_FETCH_WORKERS = 4
+
+@app.route('/api/analyze-batch')
+def analyze_batch():
+    """
+    Score many symbols in one request.
+    Fetches run concurrently; fair value and score are computed once over
+    a structured NumPy array instead of per-symbol Python calls.
+    """
+    symbols = request.args.get('symbols', '')
+    # Repeats would redo the whole upstream fan-out - keep the first of each
+    tickers = list(dict.fromkeys(s.strip().upper() for s in symbols.split(',') if s.strip()))[:30]  # Limit to 30
+    if not tickers:
+        return jsonify({'error': 'No symbols provided'})
+    
+    with ThreadPoolExecutor(max_workers=BATCH_FETCH_WORKERS) as executor:
+        fetched = list(executor.map(fetch_stock_data, tickers))
+    
+    rows = []
+    for quote, fundamentals in fetched:
+        data = build_analysis_data(quote, fundamentals)
+        data['dcf_value'] = fundamentals.get('dcf_value', 0)
+        rows.append(tuple(field_or_default(data, name, default) for name, default in BATCH_FIELDS))
+    arr = np.array(rows, dtype=BATCH_DTYPE)
+    
+    # FMP's DCF wins whenever it is non-zero (negative included), same as the
+    # single-symbol endpoint's `dcf_value or calculate_fair_value(...)`
+    fair_value = np.where(arr['dcf_value'] != 0, arr['dcf_value'], calculate_fair_value_batch(arr))
+    arr['fair_value'] = fair_value
+    scores = calculate_investment_score_batch(arr)
+    price = np.array([quote.get('price', 0) or 0 for quote, _ in fetched], dtype='f8')
+    known = ~np.isnan(fair_value)
+    upside = np.divide(fair_value - price, price, out=np.zeros_like(price), where=(price > 0) & known) * 100
+    
+    results = []
+    for i, symbol in enumerate(tickers):
+        quote = fetched[i][0]
+        score = int(scores[i])
+        results.append({
+            'symbol': symbol,
+            'name': quote.get('name', symbol),
+            'price': quote.get('price', 0),
+            'fair_value': round(float(fair_value[i]), 2) if known[i] else None,
+            'upside_percent': round(float(upside[i]), 1),
+            'investment_score': score,
+            'recommendation': get_recommendation(score, float(upside[i])),
+        })
+    
+    return jsonify({
+        'results': results,
+        'count': len(results),
+        'timestamp': datetime.now().isoformat()
+    })
+
 @app.route('/api/scan')
 def scan_opportunities():
     """
@@ -549,20 +930,24 @@ def scan_opportunities():
     
     for symbol in tickers:
         try:
-            # Get analysis
-            resp = analyze_stock(symbol)
-            analysis = resp.get_json()
-            if analysis and 'error' not in analysis:
-                opportunities.append({
-                    'symbol': symbol,
-                    'name': analysis.get('quote', {}).get('name', symbol),
-                    'price': analysis.get('quote', {}).get('price', 0),
-                    'score': analysis.get('investment_score', 0),
-                    'upside': analysis.get('upside_percent', 0),
-                    'recommendation': analysis.get('recommendation', {}),
-                    'roa': analysis.get('fundamentals', {}).get('roa', 0),
-                    'roe': analysis.get('fundamentals', {}).get('roe', 0),
-                })
+            # Ranking only needs the number - skip the checklist text
+            quote, fundamentals = fetch_stock_data(symbol)
+            analysis_data = build_analysis_data(quote, fundamentals)
+            fair_value = fundamentals.get('dcf_value') or calculate_fair_value(analysis_data)
+            analysis_data['fair_value'] = fair_value
+            score = calculate_score_only(analysis_data)
+            price = quote.get('price', 0)
+            upside = ((fair_value - price) / price * 100) if price > 0 and fair_value is not None else 0
+            opportunities.append({
+                'symbol': symbol,
+                'name': quote.get('name', symbol),
+                'price': price,
+                'score': score,
+                'upside': round(upside, 1),
+                'recommendation': get_recommendation(score, upside),
+                'roa': fundamentals.get('roa', 0),
+                'roe': fundamentals.get('roe', 0),
+            })
         except Exception as e:
             print(f"Error scanning {symbol}: {e}")
     
@@ -626,6 +1011,7 @@ if __name__ == '__main__':
     ║  • GET  /api/tickers     - All US stock symbols           ║
     ║  • GET  /api/quote/AAPL  - Get stock quote                ║
     ║  • GET  /api/analyze/AAPL - Full analysis                 ║
+    ║  • GET  /api/analyze-batch?symbols=AAPL,MSFT - Batch      ║
     ║  • GET  /api/scan        - Find opportunities             ║
     ║  • POST /api/config      - Set API keys                   ║
     ╚═══════════════════════════════════════════════════════════╝